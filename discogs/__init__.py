@@ -1,8 +1,22 @@
 from discogs.dtag import DTag, clean
 from discogs.config import Config
+from discogs.journal import RunJournal
+from discogs.duplicates import find_near_duplicates
+from discogs.pipeline import Stage
+from discogs.tag_writer import TagWriter
+from discogs.folder_cover import FolderCovers
+from discogs.search_cache import SearchCache
+from discogs.cover_cache import CoverCache
 
 __all__ = [
     "DTag",
     "clean",
     "Config",
+    "RunJournal",
+    "find_near_duplicates",
+    "Stage",
+    "TagWriter",
+    "FolderCovers",
+    "SearchCache",
+    "CoverCache",
 ]
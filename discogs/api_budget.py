@@ -0,0 +1,180 @@
+import random
+import threading
+import time
+from collections.abc import Mapping
+
+import requests
+from discogs_client.fetchers import UserTokenRequestsFetcher
+from requests.adapters import HTTPAdapter
+
+from local_files.logger import logger
+
+# Requests allowed per minute by Discogs for an authenticated token
+DISCOGS_REQUESTS_PER_MINUTE = 60
+
+# Requests that can be sent at once after an idle period. Discogs counts the
+# requests over a moving minute, so bursts are kept small.
+DEFAULT_BURST = 5
+
+# Retries of a request rejected with 429 Too Many Requests, and the bounds of
+# the exponential backoff between them, in seconds
+MAX_RETRIES = 4
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 60.0
+
+# Connections kept alive to each host, enough for the tag writer threads
+POOL_SIZE = 8
+
+# Seconds to connect to Discogs and to wait for each read of a response, so
+# that a stalled connection fails the request instead of blocking its worker
+REQUEST_TIMEOUT = (10, 30)
+
+# Rate limit headers sent by Discogs with every API response
+LIMIT_HEADER = "X-Discogs-Ratelimit"
+REMAINING_HEADER = "X-Discogs-Ratelimit-Remaining"
+
+
+class ApiBudget:
+    """Token bucket spacing out all the Discogs requests made with a token.
+
+    Tokens are refilled at the rate allowed by Discogs, up to a small burst,
+    and each request (search, master or release fetch, image download) spends
+    one, waiting for it when the bucket is empty. The rate follows the limit
+    and the remaining quota reported by Discogs in the headers of each
+    response, and a request rejected with 429 blocks the bucket for a
+    jittered, exponentially growing delay.
+
+    When a run is split into shards, all of them use the same token, so each
+    shard only spends its share of the budget: the refill rate is divided by
+    the number of shards.
+    """
+
+    def __init__(
+        self,
+        per_minute: int = DISCOGS_REQUESTS_PER_MINUTE,
+        shares: int = 1,
+        burst: int = DEFAULT_BURST,
+    ) -> None:
+        self.per_minute: int = per_minute
+        self.shares: int = shares
+        self.burst: int = burst
+        self._tokens: float = float(burst)
+        self._updated: float = time.monotonic()
+        self._blocked_until: float = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def interval(self) -> float:
+        """Average number of seconds between two requests."""
+        return 60.0 * self.shares / self.per_minute
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._tokens = min(self.burst, self._tokens + elapsed / self.interval)
+        self._updated = now
+
+    def wait(self) -> None:
+        """Wait until the next request fits in the budget, and spend it."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            # The token is reserved right away, the bucket going negative while
+            # requests wait, so that concurrent requests queue up behind it
+            self._tokens -= 1
+            delay = max(-self._tokens * self.interval, self._blocked_until - now)
+        if delay > 0:
+            time.sleep(delay)
+
+    def update(self, headers: Mapping[str, str]) -> None:
+        """Follow the rate limit headers of a Discogs response."""
+        limit = headers.get(LIMIT_HEADER)
+        remaining = headers.get(REMAINING_HEADER)
+        with self._lock:
+            self._refill(time.monotonic())
+            if limit is not None and int(limit) > 0:
+                self.per_minute = int(limit)
+            if remaining is not None:
+                # The quota is shared by all the shards using the token
+                self._tokens = min(self._tokens, int(remaining) / self.shares)
+
+    def backoff(self, attempt: int, retry_after: str | None = None) -> float:
+        """Block the budget after a request was rejected for exceeding it.
+
+        Args:
+            attempt: Number of the retry, from 0, the delay doubling each time.
+            retry_after: Value of the Retry-After header of the response.
+
+        Returns:
+            float: The number of seconds before the next request.
+        """
+        delay = min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt)
+        # Jitter, so that the shards sharing the token don't retry together
+        delay *= random.uniform(0.5, 1.0)
+        if retry_after is not None and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens = min(self._tokens, 0.0)
+            self._blocked_until = max(self._blocked_until, now + delay)
+        return delay
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        timeout: float | tuple[float, float] = REQUEST_TIMEOUT,
+        **kwargs,
+    ) -> requests.Response:
+        """Send a request within the budget, retrying it when rate limited.
+
+        Raises:
+            requests.Timeout: If Discogs doesn't answer within the timeout.
+        """
+        for attempt in range(MAX_RETRIES + 1):
+            self.wait()
+            response = session.request(method, url, timeout=timeout, **kwargs)
+            self.update(response.headers)
+            if response.status_code != 429 or attempt == MAX_RETRIES:
+                return response
+            delay = self.backoff(attempt, response.headers.get("Retry-After"))
+            logger.warning(
+                f"Discogs rate limit reached, next retry in {delay:.1f} sec."
+            )
+        return response
+
+
+class BudgetedFetcher(UserTokenRequestsFetcher):
+    """Fetcher of the Discogs client sending its requests within the budget."""
+
+    def __init__(self, user_token: str, budget: ApiBudget) -> None:
+        super().__init__(user_token)
+        self.budget: ApiBudget = budget
+
+    def fetch(self, client, method, url, data=None, headers=None, json=True):
+        response = self.budget.request(
+            method, url, params={"token": self.user_token}, data=data, headers=headers
+        )
+        return response.content, response.status_code
+
+
+# Budget of the Discogs token of this process, shared by all its requests
+api_budget = ApiBudget()
+
+# Keep-alive connections shared by all the Discogs requests and downloads
+session = requests.Session()
+session.mount("https://", HTTPAdapter(pool_maxsize=POOL_SIZE))
+
+
+def throttle(ds) -> None:
+    """Send all the requests of a Discogs client within the API budget."""
+    fetcher = getattr(ds, "_fetcher", None)
+    if type(fetcher) is UserTokenRequestsFetcher:
+        ds._fetcher = BudgetedFetcher(fetcher.user_token, api_budget)
+
+
+def download(url: str) -> bytes:
+    """Download a Discogs image within the API budget."""
+    response = api_budget.request("GET", url)
+    response.raise_for_status()
+    return response.content
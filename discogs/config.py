@@ -15,6 +15,11 @@ class Config:
             raw_path = config["local_files"]["path"].replace("\\", "")
             self.media_path = Path(raw_path)
 
+        # Local files scanning options
+        local_files_config = config.get("local_files", {})
+        self.scan_workers = local_files_config.get("scan_workers", 1)
+        self.scan_processes = local_files_config.get("scan_processes", False)
+
         # Discogs config
         discogs_config = config["discogs"]
         self.token = discogs_config["token"]
@@ -22,4 +27,13 @@ class Config:
         self.overwrite_genre = discogs_config["overwrite_genre"]
         self.embed_cover = discogs_config["embed_cover"]
         self.overwrite_cover = discogs_config["overwrite_cover"]
+        self.folder_cover = discogs_config.get("folder_cover", False)
         self.rename_file = discogs_config["rename_file"]
+        self.incremental = discogs_config.get("incremental", False)
+        self.search_workers = discogs_config.get("search_workers", 2)
+        self.fetch_workers = discogs_config.get("fetch_workers", 2)
+        self.write_workers = discogs_config.get("write_workers", 2)
+        self.watch_polling = discogs_config.get("watch_polling", False)
+        self.search_cache_days = discogs_config.get("search_cache_days", 30)
+        self.search_cache_size = discogs_config.get("search_cache_size", 100000)
+        self.cover_cache_mb = discogs_config.get("cover_cache_mb", 512)
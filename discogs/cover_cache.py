@@ -0,0 +1,174 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+
+from discogs.api_budget import download
+
+COVER_CACHE_PATH = Path("discogs") / "covers"
+
+# Default of the cover_cache_mb option
+DEFAULT_MAX_MB = 512
+
+
+def content_hash(data: bytes) -> str:
+    """Hash identifying the content of an image in the cache."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class CoverCache:
+    """Persistent, content-addressed cache of the Discogs cover images.
+
+    Images are stored once per content, under their hash, and an SQLite
+    table maps each image URI to the hash of its content. A cover is only
+    downloaded the first time its URI is seen, concurrent requests of the
+    same URI (the tracks of an album saved by the tag writer threads) waiting
+    for that single download. The least recently used images are evicted
+    beyond the maximum size.
+
+    Attributes:
+        directory: Directory of the cached images and of their index.
+        max_bytes: Total size of the images kept.
+        hits: Number of covers read from the cache.
+        downloads: Number of covers downloaded.
+    """
+
+    def __init__(
+        self, directory: Path = COVER_CACHE_PATH, max_mb: int = DEFAULT_MAX_MB
+    ) -> None:
+        self.directory: Path = directory
+        self.max_bytes: int = max_mb * 1024 * 1024
+        self.hits: int = 0
+        self.downloads: int = 0
+        self._in_flight: dict[str, Future] = {}
+        self._lock = threading.RLock()
+        directory.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            str(directory / "covers.db"), timeout=30, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS covers (
+                uri TEXT PRIMARY KEY,
+                hash TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                used_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS covers_used_at ON covers (used_at)"
+        )
+        self._conn.commit()
+
+    def __enter__(self) -> "CoverCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _image_path(self, digest: str) -> Path:
+        return self.directory / digest[:2] / f"{digest}.jpg"
+
+    def get(self, uri: str) -> bytes:
+        """Return the image at the given URI, downloading it if not cached.
+
+        Raises:
+            requests.RequestException: If the image could not be downloaded.
+        """
+        with self._lock:
+            in_flight = self._in_flight.get(uri)
+            if in_flight is None:
+                future: Future = Future()
+                self._in_flight[uri] = future
+        if in_flight is not None:
+            return in_flight.result()
+
+        try:
+            data = self._read(uri)
+            if data is None:
+                data = download(uri)
+                with self._lock:
+                    self.downloads += 1
+                self._write(uri, data)
+            else:
+                with self._lock:
+                    self.hits += 1
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[uri]
+        future.set_result(data)
+        return data
+
+    def _read(self, uri: str) -> bytes | None:
+        """Read a cached image, None if missing or corrupted."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT hash FROM covers WHERE uri = ?", (uri,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE covers SET used_at = ? WHERE uri = ?", (time.time(), uri)
+            )
+        try:
+            data = self._image_path(row[0]).read_bytes()
+        except OSError:
+            return None
+        return data if content_hash(data) == row[0] else None
+
+    def _write(self, uri: str, data: bytes) -> None:
+        """Store a downloaded image, evicting the least recently used."""
+        digest = content_hash(data)
+        path = self._image_path(digest)
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            # Written aside then renamed, not to leave a partial image
+            tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO covers (uri, hash, size, used_at) "
+                "VALUES (?, ?, ?, ?)",
+                (uri, digest, len(data), time.time()),
+            )
+            # Images shared by several URIs are counted once
+            total = self._conn.execute(
+                "SELECT SUM(size) FROM (SELECT DISTINCT hash, size FROM covers)"
+            ).fetchone()[0]
+            evicted = []
+            rows = []
+            if total > self.max_bytes:
+                rows = self._conn.execute(
+                    "SELECT uri, hash, size FROM covers ORDER BY used_at"
+                ).fetchall()
+            for old_uri, old_hash, size in rows:
+                if total <= self.max_bytes or old_uri == uri:
+                    break
+                self._conn.execute("DELETE FROM covers WHERE uri = ?", (old_uri,))
+                if (
+                    self._conn.execute(
+                        "SELECT 1 FROM covers WHERE hash = ?", (old_hash,)
+                    ).fetchone()
+                    is None
+                ):
+                    evicted.append(old_hash)
+                    total -= size
+            self._conn.commit()
+
+        for old_hash in evicted:
+            self._image_path(old_hash).unlink(missing_ok=True)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
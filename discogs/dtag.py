@@ -1,49 +1,97 @@
 import json
 import re
-import time
+import sys
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-import requests
 from discogs_client.exceptions import HTTPError
 from fuzzywuzzy import process
-from mutagen.easyid3 import EasyID3
-from mutagen.flac import FLAC, FLACNoHeaderError, Picture
-from mutagen.id3 import ID3
+from mutagen._tags import PaddingInfo
+from mutagen.flac import FLAC, Picture
+from mutagen.id3 import ID3, TCON, TDRC
 from mutagen.id3._frames import APIC
-from mutagen.mp3 import MP3, HeaderNotFoundError
-from mutagen.mp4 import MP4, MP4Cover, MP4StreamInfoError
-from mutagen._util import MutagenError
+from mutagen.id3._util import ID3NoHeaderError
+from mutagen.mp4 import MP4, MP4Cover
 
+from discogs.api_budget import api_budget, download
+from discogs.cover_cache import CoverCache
+from discogs.search_cache import NOT_FOUND_RESULT, SearchCache, SearchResult
 from local_files.logger import logger
 from local_files.music_file import MusicFile
+from local_files.types import AudioTags
+
+if TYPE_CHECKING:
+    from local_files.library_index import LibraryIndex
+
+# MP4 atoms of the tags written by DTag
+MP4_KEYS = {"genre": "\xa9gen", "date": "\xa9day"}
+
+# Padding reserved when new tags don't fit and the whole file is rewritten, so
+# that the following updates (genre, year, a new cover...) fit in place
+REWRITE_PADDING = 64 * 1024
+
+# Extensions of the files whose tags DTag can write, see DTag._load_tags
+WRITABLE_SUFFIXES = frozenset({".flac", ".mp3", ".m4a"})
+
+# How the tags of a file were written by DTag.save
+IN_PLACE = "in_place"  # Within the existing metadata region and padding
+FULL_REWRITE = "full_rewrite"  # The whole file was copied
 
 
 class DTag(MusicFile):
-    def __init__(self, path: Path, original_filename: str, config, ds) -> None:
-        # Initialize parent class
-        super().__init__(path)
+    __slots__ = (
+        "original_filename",
+        "config",
+        "ds",
+        "_cover_embedded",
+        "_local_genres",
+        "genres",
+        "_local_year",
+        "year",
+        "year_found",
+        "genres_found",
+        "year_updated",
+        "genres_updated",
+        "cover_updated",
+        "image",
+        "write_mode",
+        "cache",
+        "covers",
+        "cover_data",
+    )
+
+    def __init__(
+        self,
+        path: Path,
+        original_filename: str,
+        config,
+        ds,
+        index: "LibraryIndex | None" = None,
+        cache: SearchCache | None = None,
+        covers: CoverCache | None = None,
+    ) -> None:
+        # Initialize parent class, the tags are read (or restored from the
+        # index) in a single pass on first access
+        super().__init__(path, index=index)
 
         # DTag-specific attributes
         self.original_filename: str = original_filename
         self.config = config
         self.ds = ds
-        self.cover_embedded = False
-        self.local_genres = ""
+        self._cover_embedded: bool = False
+        self._local_genres: str = ""
         self.genres: str = ""
-        self.local_year: str = ""
+        self._local_year: str = ""
         self.year: str = ""
         self.year_found: bool = False
         self.genres_found: bool = False
         self.year_updated: bool = False
         self.genres_updated: bool = False
         self.cover_updated: bool = False
-
-        # Get additional tags (genres, year, cover info)
-        self._get_additional_tags()
-
-        # Clean title and artist tags
-        self.artist: str = clean(string=self.artist)
-        self.title: str = clean(string=self.title)
+        self.write_mode: str | None = None
+        self.cache: SearchCache | None = cache
+        self.covers: CoverCache | None = covers
+        self.cover_data: bytes | None = None
 
     def __repr__(self) -> str:
         return f"File: {self.path}"
@@ -67,162 +115,202 @@ class DTag(MusicFile):
         }
         return json.dumps(tags)
 
-    def _get_additional_tags(self) -> None:
-        """Extract additional tags (genres, year, cover) that are specific to DTag."""
-        if self.suffix == ".flac":
-            try:
-                audio = FLAC(self.path)
-                if audio.get("genre"):
-                    self.local_genres = audio["genre"][0]
-                if audio.get("date"):
-                    self.local_year = audio["date"][0]
-                if audio.pictures:
-                    self.cover_embedded = True
-            except (FLACNoHeaderError, Exception):
-                pass
-
-        elif self.suffix == ".mp3":
-            try:
-                audio = EasyID3(self.path)
-                if audio.get("genre"):
-                    self.local_genres = audio["genre"][0]
-                if audio.get("date"):
-                    self.local_year = audio["date"][0]
-
-                audio = MP3(self.path)
-                for k in audio.keys():
-                    if "covr" in k or "APIC" in k:
-                        self.cover_embedded = True
-            except (HeaderNotFoundError, MutagenError, KeyError):
-                pass
-
-        elif self.suffix == ".m4a":
-            try:
-                audio = MP4(self.path)
-                if audio.get("\xa9gen"):
-                    self.local_genres = audio["\xa9gen"][0]
-                if audio.get("\xa9day"):
-                    self.local_year = audio["\xa9day"][0]
-                if audio.get("covr"):
-                    self.cover_embedded = True
-            except (KeyError, MP4StreamInfoError, MutagenError):
-                pass
+    @property
+    def local_genres(self) -> str:
+        self.load()
+        return self._local_genres
 
-    def save(self) -> None:
+    @property
+    def local_year(self) -> str:
+        self.load()
+        return self._local_year
+
+    @property
+    def cover_embedded(self) -> bool:
+        self.load()
+        return self._cover_embedded
+
+    def _apply_tags(self, tags: AudioTags) -> None:
+        """Set the additional tags (genres, year, cover) that are specific to DTag."""
+        super()._apply_tags(tags)
+        self._local_genres = tags["genre"]
+        self._local_year = tags["date"]
+        self._cover_embedded = tags["cover"]
+
+        # Clean title and artist tags
+        self._artist = sys.intern(clean(string=self._artist))
+        self._title = clean(string=self._title)
+
+    @property
+    def writable(self) -> bool:
+        """Whether save() can write the tags of this file format."""
+        return self.suffix.lower() in WRITABLE_SUFFIXES
+
+    @property
+    def changes(self) -> frozenset[str]:
+        """The tags ("genres", "year", "cover") that save() would write.
+
+        Decided from the local tags already read and the Discogs result, so
+        neither the file nor the cover image is touched. Empty for the formats
+        whose tags can't be written.
         """
-        flac and mp3 support the same keys from mutagen,
-        .m4a does not
+        if not self.writable:
+            return frozenset()
+        changes = set()
+        if self._should_update(
+            self.genres_found,
+            self.local_genres,
+            self.genres,
+            self.config.overwrite_genre,
+        ):
+            changes.add("genres")
+        if self._should_update(
+            self.year_found, self.local_year, self.year, self.config.overwrite_year
+        ):
+            changes.add("year")
+        if (
+            hasattr(self, "image")
+            and self.config.embed_cover
+            and not self.config.folder_cover
+            and (self.config.overwrite_cover or self.cover_embedded is False)
+        ):
+            changes.add("cover")
+        return frozenset(changes)
+
+    def save(self) -> None:
+        """Write the genre, year and cover changes to the file.
+
+        The changes are computed first (see changes), and the file is neither
+        opened nor written, nor the cover downloaded, if there are none.
+        Otherwise all the changes are applied to the tags loaded in memory and
+        the file is saved only once, whatever its format. The existing padding
+        is used to write the tags in place whenever they fit, see _padding().
+        Covers come from the cover cache when given, and a cover identical to
+        the embedded one is not written again.
         """
-        if self.year_found is False and self.genres_found is False:
+        changes = self.changes
+        if not changes:
             return
 
-        if self.suffix == ".flac":
-            self._image_flac()
-            audio = FLAC(self.path)
-        elif self.suffix == ".mp3":
-            self._image_mp3()
-            audio = EasyID3(self.path)
-        elif self.suffix == ".m4a":
-            self._save_m4a()
+        audio = self._load_tags()
+        if audio is None:
             return
 
-        if self.genres_found and (self.local_genres != self.genres):
-            if self.config.overwrite_genre:
-                audio["genre"] = self.genres
-                self.genres_updated = True
-            else:
-                if self.local_genres == "":
-                    audio["genre"] = self.genres
-                    self.genres_updated = True
-
-        if self.year_found and (self.local_year != self.year):
-            if self.config.overwrite_year:
-                audio["date"] = self.year
-                self.year_updated = True
+        if "cover" in changes:
+            cover = self.fetch_cover()
+            # The downloaded cover is only needed until written
+            self.cover_data = None
+            # The same cover is not written again
+            if cover == self._get_cover(audio):
+                changes -= {"cover"}
+                if not changes:
+                    return
+
+        if "genres" in changes:
+            self._set_text_tag(audio, "genre", self.genres)
+            self.genres_updated = True
+
+        if "year" in changes:
+            self._set_text_tag(audio, "date", self.year)
+            self.year_updated = True
+
+        if "cover" in changes:
+            self._set_cover(audio, cover)
+            self.cover_updated = True
+
+        if isinstance(audio, ID3):
+            audio.save(self.path, padding=self._padding)
+        else:
+            audio.save(padding=self._padding)
+
+    def fetch_cover(self) -> bytes:
+        """Download the Discogs cover, from the cover cache when given.
+
+        Can be called ahead of save(), which then uses the downloaded cover.
+        """
+        if self.cover_data is None:
+            if self.covers is not None:
+                self.cover_data = self.covers.get(self.image)
             else:
-                if self.local_year == "":
-                    audio["date"] = self.year
-                    self.year_updated = True
+                self.cover_data = download(self.image)
+        return self.cover_data
 
-        audio.save()
+    def _padding(self, info: PaddingInfo) -> int:
+        """Choose the padding left after the tags when saving them.
 
-    def _save_m4a(self) -> None:
-        """
-        code duplication from self.save
+        If the new tags fit in the existing metadata region, all its padding
+        is kept (mutagen would otherwise shrink a large padding, rewriting the
+        whole file), so only the tags are overwritten. Otherwise the file has
+        to be rewritten, and extra padding is reserved for the next updates.
         """
-        audio = MP4(self.path)
-        if self.genres_found and (self.local_genres != self.genres):
-            if self.config.overwrite_genre:
-                audio["\xa9gen"] = self.genres
-                self.genres_updated = True
-            else:
-                if self.local_genres == "":
-                    audio["\xa9gen"] = self.genres
-                    self.genres_updated = True
-
-        if self.year_found and (self.local_year != self.year):
-            if self.config.overwrite_year:
-                audio["\xa9day"] = self.year
-                self.year_updated = True
-            else:
-                if self.local_year == "":
-                    audio["\xa9day"] = self.year
-                    self.year_updated = True
-        # save image
-        if hasattr(self, "image") and self.config.embed_cover:
-            if self.config.overwrite_cover:
-                audio["covr"] = [
-                    MP4Cover(
-                        requests.get(self.image).content,
-                        imageformat=MP4Cover.FORMAT_JPEG,
-                    )
-                ]
-                self.cover_updated = True
-        audio.save()
-
-    def _image_flac(self) -> None:
-        if hasattr(self, "image") and self.config.embed_cover:
-            audio = FLAC(self.path)
-            img = Picture()
-            img.type = 3
-            img.data = requests.get(self.image).content
-            if self.config.overwrite_cover:
-                audio.clear_pictures()
-                audio.add_picture(img)
-                self.cover_updated = True
-            else:
-                if self.cover_embedded is False:
-                    audio.clear_pictures()
-                    audio.add_picture(img)
-                    self.cover_updated = True
-            audio.save()
-
-    def _image_mp3(self) -> None:
-        def _update_image(path: Path, data: bytes) -> None:
-            # del image
-            audio_id3 = ID3(path)
-            audio_id3.delall("APIC")
-            audio_id3.save()
-
-            # update
-            audio = MP3(self.path, ID3=ID3)
-            audio.tags.add(
+        if info.padding >= 0:
+            self.write_mode = IN_PLACE
+            return info.padding
+        self.write_mode = FULL_REWRITE
+        return REWRITE_PADDING
+
+    @staticmethod
+    def _should_update(found: bool, local: str, new: str, overwrite: bool) -> bool:
+        """Whether a tag found on Discogs should replace the local one."""
+        return found and local != new and (overwrite or local == "")
+
+    def _load_tags(self) -> FLAC | ID3 | MP4 | None:
+        """Load the tags of the file for writing, None if the format is unsupported."""
+        # Extensions are matched case-insensitively when scanning the library
+        suffix = self.suffix.lower()
+        if suffix == ".flac":
+            return FLAC(self.path)
+        elif suffix == ".mp3":
+            try:
+                return ID3(self.path)
+            except ID3NoHeaderError:
+                return ID3()
+        elif suffix == ".m4a":
+            return MP4(self.path)
+        return None
+
+    @staticmethod
+    def _set_text_tag(audio: FLAC | ID3 | MP4, key: str, value: str) -> None:
+        """Set the "genre" or "date" tag, with the key of the tag format."""
+        if isinstance(audio, ID3):
+            frame = TCON if key == "genre" else TDRC
+            audio.add(frame(encoding=3, text=value))
+        elif isinstance(audio, MP4):
+            audio[MP4_KEYS[key]] = value
+        else:
+            audio[key] = value
+
+    @staticmethod
+    def _get_cover(audio: FLAC | ID3 | MP4) -> bytes | None:
+        """Return the embedded front cover (or first picture), if any."""
+        if isinstance(audio, ID3):
+            pictures = [(frame.type, frame.data) for frame in audio.getall("APIC")]
+        elif isinstance(audio, MP4):
+            pictures = [(3, bytes(cover)) for cover in audio.get("covr", [])]
+        else:
+            pictures = [(picture.type, picture.data) for picture in audio.pictures]
+        if not pictures:
+            return None
+        return next((data for kind, data in pictures if kind == 3), pictures[0][1])
+
+    @staticmethod
+    def _set_cover(audio: FLAC | ID3 | MP4, data: bytes) -> None:
+        """Replace the embedded front covers by the given image."""
+        if isinstance(audio, ID3):
+            audio.delall("APIC")
+            audio.add(
                 APIC(encoding=3, mime="image/jpeg", type=3, desc="Cover", data=data)
             )
-            audio.save()
-
-        # check if image was found
-        if hasattr(self, "image") and self.config.embed_cover:
-            if self.config.overwrite_cover:
-                _update_image(self.path, requests.get(self.image).content)
-                self.cover_updated = True
-            else:
-                if self.cover_embedded is False:
-                    _update_image(self.path, requests.get(self.image).content)
-                    self.cover_updated = True
+        elif isinstance(audio, MP4):
+            audio["covr"] = [MP4Cover(data, imageformat=MP4Cover.FORMAT_JPEG)]
+        else:
+            img = Picture()
+            img.type = 3
+            img.data = data
+            audio.clear_pictures()
+            audio.add_picture(img)
 
     def search(self, retry: int = 3) -> bool | None:
-        retry -= 1
         # check if track has required tags for searching
         if self.artist == "" and self.title == "":
             logger.error(
@@ -230,59 +318,95 @@ class DTag(MusicFile):
             )
             return False
 
+        # searches answered before, or in progress for another file, are not
+        # sent to Discogs again
+        if self.cache is not None:
+            result = self.cache.lookup(
+                self.artist, self.title, lambda: self._search_discogs(retry)
+            )
+        else:
+            result = self._search_discogs(retry)
+        if result is None:
+            return False
+        return self._apply(result)
+
+    def _search_discogs(self, retry: int = 3) -> SearchResult | None:
+        """Search the best match of the track on Discogs.
+
+        Returns:
+            SearchResult | None: The match, or None if Discogs kept failing.
+        """
+        retry -= 1
         logger.info(f'Searching for "{self.title} {self.artist}" on Discogs...')
-        # discogs api limit: 60/1minute
-        # retry option added
-        time.sleep(0.5)
+        # discogs api limit: 60/1minute, shared by the shards of a run, each
+        # request of the client waits for its turn in the api budget
         try:
             # Use original code without timeout modification
             res = self.ds.search(type="master", artist=self.artist, track=self.title)
 
             local_string = f"{self.title} {self.artist}"
             discogs_list = []
+            result = NOT_FOUND_RESULT
             if res.count > 0:
                 for i, track in enumerate(res):
                     d_artist = ""
                     if track.data.get("artist"):
-                        d_artist = d_artist["artist"][0]["name"]
+                        d_artist = track.data["artist"][0]["name"]
                     d_title = track.title
 
                     # create string for comparison
                     discogs_string = f"{d_title} {d_artist}"
 
                     # append to list
-                    discogs_list.append({"index": i, "str": discogs_string})
+                    discogs_list.append(
+                        {"index": i, "str": discogs_string, "artist": d_artist}
+                    )
 
                 # get best match from list
-                best_one = process.extractBests(local_string, discogs_list, limit=1)[0][
-                    0
-                ]["index"]
-
-                # check if genre is missing
-                if res[best_one].genres:
-                    genres = ", ".join(sorted([x for x in res[best_one].genres]))
-                    self.genres = genres
-                    self.genres_found = True
-
-                if res[best_one].data["year"]:
-                    year = res[best_one].data["year"]
-                    self.year = str(year)
-                    self.year_found = True
-
-                if res[best_one].images:
-                    self.image = res[best_one].images[0]["uri"]
-            else:
-                logger.warning("Not Found on Discogs.")
-                return False
+                best = process.extractBests(local_string, discogs_list, limit=1)[0][0]
+                master = res[best["index"]]
+                result = SearchResult(
+                    found=True,
+                    title=master.title,
+                    artist=best["artist"],
+                    genres=", ".join(sorted(master.genres or [])),
+                    year=str(master.data["year"] or ""),
+                    image=master.images[0]["uri"] if master.images else "",
+                )
         except HTTPError:
             if retry == 0:
                 logger.error(f"Too many API calls, skipping {self}")
-                return False
+                return None
+            delay = api_budget.backoff(attempt=2 - retry)
             logger.error(
-                f"Too many API calls. {retry} retries left, next retry in 5 sec."
+                f"Too many API calls. {retry} retries left, "
+                f"next retry in {delay:.1f} sec."
             )
-            time.sleep(5)
-            self.search(retry=retry)
+            return self._search_discogs(retry=retry)
+        return result
+
+    def _apply(self, result: SearchResult) -> bool | None:
+        """Take the genres, year and cover of the best Discogs match.
+
+        Returns:
+            bool | None: None if found on Discogs, False otherwise, as search().
+        """
+        if not result.found:
+            logger.warning("Not Found on Discogs.")
+            return False
+
+        # check if genre is missing
+        if result.genres:
+            self.genres = result.genres
+            self.genres_found = True
+
+        if result.year:
+            self.year = result.year
+            self.year_found = True
+
+        if result.image:
+            self.image = result.image
+        return None
 
 
 def clean(string: str) -> str:
@@ -0,0 +1,108 @@
+import re
+import unicodedata
+from collections import defaultdict
+from collections.abc import Iterable
+
+from fuzzywuzzy import fuzz
+
+from discogs.dtag import clean
+from local_files.music_file import MusicFile
+
+# Minimum fuzzy score (0-100) of two titles of the same artist to be duplicates
+NEAR_DUPLICATE_THRESHOLD = 90
+
+
+def _fold(string: str) -> str:
+    """Drop the case, accents and punctuation of a string."""
+    string = unicodedata.normalize("NFKD", string.casefold())
+    string = "".join(c for c in string if not unicodedata.combining(c))
+    return " ".join(re.sub(r"[^\w\s]", " ", string).split())
+
+
+def normalize_artist(artist: str) -> str:
+    """Normalize an artist into a comparable key.
+
+    Bracketed content and featured artists (after a comma or an ampersand)
+    are dropped, as for the Discogs searches, see clean().
+    """
+    return _fold(clean(re.sub(r"\[[^\]]*\]", "", artist)))
+
+
+def normalize_title(title: str) -> str:
+    """Normalize a title into a comparable key.
+
+    Only the bracketed content and the version suffix of titles like
+    "Title - Radio Edit" are dropped, commas and ampersands being part of
+    titles such as "Love & Hate".
+    """
+    title = re.sub(r"\([^)]*\)|\[[^\]]*\]", "", title)
+    return _fold(re.split(r"\s+-\s+", title.strip())[0])
+
+
+def duplicate_key(music_file: MusicFile) -> tuple[str, str]:
+    """Return the normalized (artist, title) key of a music file."""
+    return normalize_artist(music_file.artist), normalize_title(music_file.title)
+
+
+def find_near_duplicates(
+    music_files: Iterable[MusicFile], threshold: int = NEAR_DUPLICATE_THRESHOLD
+) -> list[list[MusicFile]]:
+    """Find the music files that are likely the same track.
+
+    Files are hashed into buckets by their normalized (artist, title) key,
+    files sharing a bucket being duplicates, e.g. "Artist - Title (Radio
+    Edit)" and "Artist - Title". Buckets are then blocked by artist, and
+    fuzzy scoring is only run between the titles of a same artist, skipping
+    the pairs whose length difference alone rules out the threshold. This
+    avoids comparing every pair of files of the library.
+
+    Args:
+        music_files: The music files to compare, those without artist or
+            title tags are ignored.
+        threshold: Minimum fuzzy score of two titles to be duplicates.
+
+    Returns:
+        list[list[MusicFile]]: The groups of near duplicate files, each sorted
+            by path, sorted by their first path.
+    """
+    buckets: dict[tuple[str, str], list[MusicFile]] = defaultdict(list)
+    for music_file in music_files:
+        if music_file.artist and music_file.title:
+            key = duplicate_key(music_file)
+            if all(key):
+                buckets[key].append(music_file)
+
+    blocks: dict[str, list[str]] = defaultdict(list)
+    for artist, title in buckets:
+        blocks[artist].append(title)
+
+    # Union-find over the buckets, merged by the fuzzy matches of their titles
+    parent: dict[tuple[str, str], tuple[str, str]] = {key: key for key in buckets}
+
+    def find(key: tuple[str, str]) -> tuple[str, str]:
+        while parent[key] != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+
+    for artist, titles in blocks.items():
+        titles.sort(key=len)
+        for i, title in enumerate(titles):
+            for other in titles[i + 1 :]:
+                # The ratio can't exceed 2 * shortest / total length
+                if 200 * len(title) < threshold * (len(title) + len(other)):
+                    break
+                if fuzz.ratio(title, other) >= threshold:
+                    parent[find((artist, other))] = find((artist, title))
+
+    groups: dict[tuple[str, str], list[MusicFile]] = defaultdict(list)
+    for key, files in buckets.items():
+        groups[find(key)].extend(files)
+    return sorted(
+        (
+            sorted(group, key=lambda f: f.path)
+            for group in groups.values()
+            if len(group) > 1
+        ),
+        key=lambda group: group[0].path,
+    )
@@ -0,0 +1,63 @@
+from collections import defaultdict
+from pathlib import Path
+
+import requests
+
+from discogs.api_budget import download
+from discogs.cover_cache import CoverCache
+from discogs.dtag import DTag
+from local_files.logger import logger
+from local_files.music_files import iter_music_paths
+
+FOLDER_COVER_NAME = "cover.jpg"
+
+
+class FolderCovers:
+    """Write one cover.jpg per album directory, instead of embedding covers.
+
+    The Discogs image found for each track is collected by directory. Once
+    all the tracks are processed, a directory gets a cover.jpg if all its
+    music files were processed and resolved to the same image, which is then
+    downloaded only once.
+    """
+
+    def __init__(
+        self, overwrite: bool = False, covers: CoverCache | None = None
+    ) -> None:
+        self.overwrite: bool = overwrite
+        self.covers: CoverCache | None = covers
+        self._images: dict[Path, list[str | None]] = defaultdict(list)
+
+    def add(self, tag_file: DTag) -> None:
+        """Collect the Discogs image of a processed track, if any."""
+        self._images[tag_file.path.parent].append(getattr(tag_file, "image", None))
+
+    def write(self) -> int:
+        """Write the cover of the directories whose tracks share an image.
+
+        Returns:
+            int: The number of covers written.
+        """
+        written = 0
+        for directory, images in sorted(self._images.items()):
+            image = images[0]
+            if image is None or any(other != image for other in images):
+                continue
+            if len(images) != sum(1 for _ in iter_music_paths(directory, False)):
+                continue  # Some tracks were not processed in this run
+
+            cover_path = directory / FOLDER_COVER_NAME
+            if cover_path.exists() and not self.overwrite:
+                continue
+            try:
+                if self.covers is not None:
+                    data = self.covers.get(image)
+                else:
+                    data = download(image)
+                cover_path.write_bytes(data)
+            except (OSError, requests.RequestException) as e:
+                logger.error(f"Error writing {cover_path}: {e}")
+                continue
+            logger.success(f"Cover written: {cover_path}")
+            written += 1
+        return written
@@ -0,0 +1,153 @@
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+
+from local_files.library_index import LibraryIndex
+from local_files.shard import Shard
+
+JOURNAL_PATH = Path("discogs") / "discogs_journal.db"
+
+# Outcomes of processing a file with the Discogs tag updater
+FOUND = "found"  # Discogs info found, nothing to change in the file
+NOT_FOUND = "not_found"  # Not found on Discogs
+UPDATED = "updated"  # Discogs info found and written to the file
+
+# Outcomes after which a file is skipped by incremental runs while unchanged
+SUCCESSFUL_OUTCOMES = (FOUND, UPDATED)
+
+
+def journal_path(shard: Shard | None = None) -> Path:
+    """Path of the run journal, each shard of a run writing its own."""
+    if shard is None:
+        return JOURNAL_PATH
+    return JOURNAL_PATH.with_name(f"{JOURNAL_PATH.stem}.{shard.suffix}.db")
+
+
+class RunJournal:
+    """Persistent journal of the Discogs tag updater runs.
+
+    For each processed file, records its stat signature (size, mtime, inode)
+    after processing, next to the outcome and the Discogs genres and year.
+    Incremental runs skip the files successfully processed before that have
+    not changed on disk since.
+
+    Files are recorded by their path relative to the library root, as for the
+    shards, so that journals written on machines mounting the library at
+    different places can be merged and used by each other. The journal of a
+    shard also reads the main journal, into which the journals of previous
+    sharded runs were merged, so that a file done by any of them is skipped.
+    """
+
+    def __init__(
+        self,
+        db_path: Path = JOURNAL_PATH,
+        root: Path | None = None,
+        merged: Path | None = None,
+    ) -> None:
+        self.db_path: Path = db_path
+        self.root: Path | None = root
+        # Journal of the previous runs, only read
+        self._merged: sqlite3.Connection | None = None
+        if merged is not None and merged != db_path and merged.is_file():
+            self._merged = sqlite3.connect(
+                f"{merged.resolve().as_uri()}?mode=ro", uri=True
+            )
+        self._conn = sqlite3.connect(str(db_path))
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                outcome TEXT NOT NULL,
+                genres TEXT NOT NULL,
+                year TEXT NOT NULL,
+                processed_at TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def __enter__(self) -> "RunJournal":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _key(self, path: Path) -> str:
+        """Key of a file in the journal, its path relative to the library root."""
+        if self.root is None:
+            return str(path)
+        try:
+            return path.relative_to(self.root).as_posix()
+        except ValueError:
+            return str(path)
+
+    def is_done(self, path: Path) -> bool:
+        """Whether the file was successfully processed and is unchanged since."""
+        rows = [self._find(self._conn, path)]
+        if self._merged is not None:
+            rows.append(self._find(self._merged, path))
+        signature = None
+        for row in rows:
+            if row is None or row[3] not in SUCCESSFUL_OUTCOMES:
+                continue
+            if signature is None:
+                signature = LibraryIndex.signature(path)
+            if tuple(row[:3]) == signature:
+                return True
+        return False
+
+    def _find(self, conn: sqlite3.Connection, path: Path) -> tuple | None:
+        """Record of a file in a journal, None if it was never processed."""
+        query = "SELECT size, mtime_ns, inode, outcome FROM files WHERE path = ?"
+        row = conn.execute(query, (self._key(path),)).fetchone()
+        if row is None and self.root is not None:
+            # Recorded by an older version, by absolute path
+            row = conn.execute(query, (str(path),)).fetchone()
+        return row
+
+    def record(
+        self, path: Path, outcome: str, genres: str = "", year: str = ""
+    ) -> None:
+        """Record the outcome of processing a file, once it has been written."""
+        signature = LibraryIndex.signature(path)
+        if signature is None:
+            return
+        self._conn.execute(
+            "INSERT OR REPLACE INTO files "
+            "(path, size, mtime_ns, inode, outcome, genres, year, processed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                self._key(path),
+                *signature,
+                outcome,
+                genres,
+                year,
+                datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            ),
+        )
+        self._conn.commit()
+
+    def merge(self, db_path: Path) -> int:
+        """Copy the records of another journal, e.g. of a shard, into this one.
+
+        Returns:
+            int: The number of records copied.
+        """
+        self._conn.execute("ATTACH DATABASE ? AS other", (str(db_path),))
+        try:
+            cursor = self._conn.execute(
+                "INSERT OR REPLACE INTO files SELECT * FROM other.files"
+            )
+            self._conn.commit()
+        finally:
+            self._conn.execute("DETACH DATABASE other")
+        return cursor.rowcount
+
+    def close(self) -> None:
+        self._conn.commit()
+        self._conn.close()
+        if self._merged is not None:
+            self._merged.close()
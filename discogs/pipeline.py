@@ -0,0 +1,93 @@
+import queue
+import threading
+from collections.abc import Callable, Iterator
+from typing import Any
+
+# Number of items that can wait for each stage
+STAGE_QUEUE_SIZE = 32
+
+
+class Stage:
+    """Pool of threads applying one step of the tag updater to files.
+
+    Items are submitted through a bounded queue, so that a slow stage holds
+    back the stages feeding it instead of piling up files in memory, and are
+    handed back with their result through completed(), for the submitting
+    thread to pass them on to the next stage.
+
+    Attributes:
+        name: Name of the stage, for the thread names.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[Any], Any],
+        workers: int = 1,
+        queue_size: int = STAGE_QUEUE_SIZE,
+    ) -> None:
+        self.name: str = name
+        self._func = func
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._done: queue.Queue[tuple[Any, Any, Exception | None]] = queue.Queue()
+        self._pending: int = 0
+        self._threads = [
+            threading.Thread(target=self._run, name=f"{name}-{i}", daemon=True)
+            for i in range(max(workers, 1))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def __enter__(self) -> "Stage":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def pending(self) -> int:
+        """Number of items submitted and not yet handed back."""
+        return self._pending
+
+    def submit(self, item: Any) -> None:
+        """Queue an item, waiting if the queue is full."""
+        self._pending += 1
+        self._queue.put(item)
+
+    def completed(
+        self, block: bool = False
+    ) -> Iterator[tuple[Any, Any, Exception | None]]:
+        """Yield the items processed so far, with their result or error.
+
+        Args:
+            block: Wait for at least one item, if any is pending.
+        """
+        while self._pending:
+            try:
+                item = self._done.get(block=block)
+            except queue.Empty:
+                return
+            block = False
+            self._pending -= 1
+            yield item
+
+    def close(self) -> None:
+        """Wait for all the submitted items to be processed, then stop."""
+        if not any(thread.is_alive() for thread in self._threads):
+            return
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def _process(self, item: Any) -> Any:
+        return self._func(item)
+
+    def _run(self) -> None:
+        while (item := self._queue.get()) is not None:
+            result, error = None, None
+            try:
+                result = self._process(item)
+            except Exception as e:
+                error = e
+            self._done.put((item, result, error))
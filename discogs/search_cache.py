@@ -0,0 +1,212 @@
+import sqlite3
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future
+from pathlib import Path
+from typing import NamedTuple
+
+SEARCH_CACHE_PATH = Path("discogs") / "search_cache.db"
+
+# Defaults of the search_cache_days and search_cache_size options
+DEFAULT_TTL_DAYS = 30
+DEFAULT_MAX_ENTRIES = 100_000
+
+# Number of cache hits buffered before committing their use time to disk,
+# searches are committed right away as each of them cost an API call
+COMMIT_EVERY = 50
+
+
+class SearchResult(NamedTuple):
+    """Fields of the best Discogs match of a search used by DTag.
+
+    Attributes:
+        found: Whether Discogs returned any result for the search.
+        title: Title of the best match.
+        artist: Artist of the best match, if returned by Discogs.
+        genres: Comma separated genres, sorted.
+        year: Release year, empty if unknown.
+        image: URI of the primary image, empty if none.
+    """
+
+    found: bool
+    title: str = ""
+    artist: str = ""
+    genres: str = ""
+    year: str = ""
+    image: str = ""
+
+
+# Result of a search without any match
+NOT_FOUND_RESULT = SearchResult(found=False)
+
+
+def query_key(artist: str, title: str) -> str:
+    """Normalize a search query, case and spacing don't change its results."""
+    return "\n".join(" ".join(value.split()).casefold() for value in (artist, title))
+
+
+class SearchCache:
+    """Persistent SQLite cache of the Discogs searches made by DTag.
+
+    Each row is keyed by the normalized (artist, title) query and stores the
+    fields of the best match, or that nothing was found. Rows expire after
+    the TTL, so that the changes made on Discogs are eventually picked up,
+    and the least recently used rows are evicted beyond the maximum size.
+    Concurrent lookups of the same query are coalesced, a single search
+    answering all of them. The cache file is shared by the shards of a run
+    on the same machine, and can be copied along the library to others.
+
+    Attributes:
+        db_path: Path of the SQLite database file.
+        ttl: Number of seconds a search result is reused.
+        max_entries: Number of search results kept.
+        hits: Number of searches answered from the cache.
+        misses: Number of searches that had to query Discogs.
+        coalesced: Number of lookups answered by a search in progress.
+    """
+
+    def __init__(
+        self,
+        db_path: Path = SEARCH_CACHE_PATH,
+        ttl_days: float = DEFAULT_TTL_DAYS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ) -> None:
+        self.db_path: Path = db_path
+        self.ttl: float = ttl_days * 24 * 3600
+        self.max_entries: int = max_entries
+        self.hits: int = 0
+        self.misses: int = 0
+        self.coalesced: int = 0
+        self._pending: int = 0
+        self._in_flight: dict[str, Future] = {}
+        # Shared by the threads of a run, and by the processes of its shards
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(db_path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS searches (
+                query TEXT PRIMARY KEY,
+                found INTEGER NOT NULL,
+                title TEXT NOT NULL,
+                artist TEXT NOT NULL,
+                genres TEXT NOT NULL,
+                year TEXT NOT NULL,
+                image TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                used_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS searches_used_at ON searches (used_at)"
+        )
+        self._conn.commit()
+
+    def __enter__(self) -> "SearchCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def get(self, artist: str, title: str) -> SearchResult | None:
+        """Return the cached result of a search.
+
+        Returns:
+            SearchResult | None: The result if a fresh one was cached, None if
+                Discogs has to be searched.
+        """
+        key = query_key(artist, title)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT found, title, artist, genres, year, image, stored_at "
+                "FROM searches WHERE query = ?",
+                (key,),
+            ).fetchone()
+            if row is None or row[6] + self.ttl < now:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute(
+                "UPDATE searches SET used_at = ? WHERE query = ?", (now, key)
+            )
+            self._pending += 1
+            if self._pending >= COMMIT_EVERY:
+                self.commit()
+        return SearchResult(bool(row[0]), *row[1:6])
+
+    def lookup(
+        self,
+        artist: str,
+        title: str,
+        search: Callable[[], SearchResult | None],
+    ) -> SearchResult | None:
+        """Return the result of a search, from the cache or searching Discogs.
+
+        When the same query is already being searched for another file, its
+        result is waited for instead of searching again.
+
+        Args:
+            artist: Artist of the query.
+            title: Title of the query.
+            search: Function searching Discogs on a cache miss, returning None
+                on failure (the failure is not cached).
+        """
+        key = query_key(artist, title)
+        with self._lock:
+            in_flight = self._in_flight.get(key)
+            if in_flight is None:
+                future: Future = Future()
+                self._in_flight[key] = future
+            else:
+                self.coalesced += 1
+        if in_flight is not None:
+            return in_flight.result()
+
+        try:
+            result = self.get(artist, title)
+            if result is None:
+                result = search()
+                if result is not None:
+                    self.put(artist, title, result)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+        future.set_result(result)
+        return result
+
+    def put(self, artist: str, title: str, result: SearchResult) -> None:
+        """Store the result of a search, evicting the least recently used."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO searches (query, found, title, artist, "
+                "genres, year, image, stored_at, used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (query_key(artist, title), *result, now, now),
+            )
+            excess = (
+                self._conn.execute("SELECT COUNT(*) FROM searches").fetchone()[0]
+                - self.max_entries
+            )
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM searches WHERE query IN "
+                    "(SELECT query FROM searches ORDER BY used_at LIMIT ?)",
+                    (excess,),
+                )
+            self.commit()
+
+    def commit(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._pending = 0
+
+    def close(self) -> None:
+        self.commit()
+        self._conn.close()
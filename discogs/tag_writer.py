@@ -0,0 +1,29 @@
+import threading
+
+from discogs.dtag import DTag
+from discogs.pipeline import Stage
+
+# Number of files found on Discogs that can wait for their tags to be written
+WRITE_QUEUE_SIZE = 32
+
+# Number of locks the files are spread over, a file always gets the same lock
+FILE_LOCKS = 64
+
+
+class TagWriter(Stage):
+    """Background pool of threads saving the tags of files found on Discogs.
+
+    Files are submitted through a bounded queue once searched, and saved
+    by the worker threads, so the search loop only waits on the Discogs API.
+    Saves of the same file are serialized by a per-file lock. Saved files are
+    handed back through completed(), so that the results are recorded and
+    logged by the submitting thread.
+    """
+
+    def __init__(self, workers: int = 2, queue_size: int = WRITE_QUEUE_SIZE) -> None:
+        self._locks = [threading.Lock() for _ in range(FILE_LOCKS)]
+        super().__init__("write", DTag.save, workers=workers, queue_size=queue_size)
+
+    def _process(self, tag_file: DTag) -> None:
+        with self._locks[hash(tag_file.path) % FILE_LOCKS]:
+            tag_file.save()
@@ -1,13 +1,58 @@
-from local_files.music_files import get_music_files, AUDIO_FILES_EXTENSIONS
+from local_files.music_files import (
+    get_music_files,
+    iter_music_paths,
+    read_music_files,
+    iter_music_files,
+    AUDIO_FILES_EXTENSIONS,
+)
 from local_files.music_file import MusicFile
-from local_files.rename_file import rename_file, sanitize_filename
+from local_files.tag_reader import read_tags
+from local_files.types import AudioTags
+from local_files.library_index import LibraryIndex
+from local_files.rename_file import rename_file, sanitize_filename, target_filename
+from local_files.rename_plan import (
+    RenamePlanEntry,
+    plan_renames,
+    write_rename_plan,
+    read_rename_plan,
+    apply_rename_plan,
+)
+from local_files.audio_hash import hash_audio, find_duplicates
+from local_files.watcher import watch_music_files
+from local_files.shard import (
+    Shard,
+    shard_from_args,
+    write_shard_summary,
+    merge_shard_summaries,
+)
+from local_files.tag_table import TagTable
 from local_files.logger import logger
 
 __all__ = [
     "logger",
     "get_music_files",
+    "iter_music_paths",
+    "read_music_files",
+    "iter_music_files",
     "AUDIO_FILES_EXTENSIONS",
     "MusicFile",
+    "read_tags",
+    "AudioTags",
+    "LibraryIndex",
     "rename_file",
     "sanitize_filename",
+    "target_filename",
+    "RenamePlanEntry",
+    "plan_renames",
+    "write_rename_plan",
+    "read_rename_plan",
+    "apply_rename_plan",
+    "hash_audio",
+    "find_duplicates",
+    "watch_music_files",
+    "Shard",
+    "shard_from_args",
+    "write_shard_summary",
+    "merge_shard_summaries",
+    "TagTable",
 ]
@@ -0,0 +1,181 @@
+import hashlib
+import mmap
+import struct
+from collections import defaultdict
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from local_files.fast_tags import Unsupported, _mp4_boxes, _syncsafe
+from local_files.library_index import LibraryIndex
+
+
+def hash_audio(path: Path) -> str | None:
+    """Hash the audio payload of a music file, leaving out its metadata.
+
+    The file is memory-mapped and only the audio regions are fed to the hash:
+    the MPEG frames of MP3 files (without the ID3v2, APEv2, Lyrics3 and ID3v1
+    tags), the frames following the metadata blocks of FLAC files, the `mdat`
+    boxes of M4A files and the `data` chunk of WAV files. OGG files, and files
+    whose layout cannot be parsed, are hashed whole.
+
+    Two copies of the same encoded audio thus get the same hash whatever
+    their tags, cover or file name.
+
+    Args:
+        path: Path to the music file to hash.
+
+    Returns:
+        str | None: The hex digest, or None if the file can't be read or has
+            no audio payload.
+    """
+    suffix = path.suffix.lower()
+    try:
+        with (
+            open(path, "rb") as f,
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf,
+        ):
+            try:
+                if suffix == ".mp3":
+                    ranges = _mp3_ranges(buf)
+                elif suffix == ".flac":
+                    ranges = _flac_ranges(buf)
+                elif suffix == ".m4a":
+                    ranges = _mp4_ranges(buf)
+                elif suffix == ".wav":
+                    ranges = _wav_ranges(buf)
+                else:
+                    ranges = [(0, len(buf))]
+            except (Unsupported, ValueError, IndexError, struct.error):
+                ranges = [(0, len(buf))]
+
+            if not any(end > start for start, end in ranges):
+                return None
+            digest = hashlib.blake2b(digest_size=16)
+            # Hashing large buffers releases the GIL, so worker threads run in parallel
+            with memoryview(buf) as view:
+                for start, end in ranges:
+                    with view[start:end] as chunk:
+                        digest.update(chunk)
+            return digest.hexdigest()
+    except (OSError, ValueError):
+        return None
+
+
+def _skip_id3v2(buf: mmap.mmap, pos: int = 0) -> int:
+    """Return the position after the ID3v2 tags found at pos, if any."""
+    while buf[pos : pos + 3] == b"ID3":
+        size = _syncsafe(buf[pos + 6 : pos + 10]) + 10
+        if buf[pos + 5] & 0x10:  # Footer present
+            size += 10
+        pos += size
+    return pos
+
+
+def _strip_id3v1(buf: mmap.mmap, end: int) -> int:
+    if end >= 128 and buf[end - 128 : end - 125] == b"TAG":
+        end -= 128
+    return end
+
+
+def _mp3_ranges(buf: mmap.mmap) -> list[tuple[int, int]]:
+    start = _skip_id3v2(buf)
+    end = len(buf)
+
+    # Trailing tags may come in any order before the ID3v1 tag
+    while True:
+        previous_end = end
+        end = _strip_id3v1(buf, end)
+        if end >= 32 and buf[end - 32 : end - 24] == b"APETAGEX":
+            size, _, flags = struct.unpack("<III", buf[end - 20 : end - 8])
+            end -= size + (32 if flags & 0x80000000 else 0)
+        if end >= 15 and buf[end - 9 : end] == b"LYRICS200":
+            end -= int(buf[end - 15 : end - 9]) + 15
+        if end == previous_end:
+            break
+    if end < start:
+        raise Unsupported("overlapping MP3 tags")
+    return [(start, end)]
+
+
+def _flac_ranges(buf: mmap.mmap) -> list[tuple[int, int]]:
+    pos = _skip_id3v2(buf)
+    if buf[pos : pos + 4] != b"fLaC":
+        raise Unsupported("not a FLAC file")
+    pos += 4
+    while True:
+        header = buf[pos]
+        pos += 4 + int.from_bytes(buf[pos + 1 : pos + 4], "big")
+        if header & 0x80:  # Last metadata block
+            break
+    return [(pos, _strip_id3v1(buf, len(buf)))]
+
+
+def _mp4_ranges(buf: mmap.mmap) -> list[tuple[int, int]]:
+    ranges = [
+        (start, end)
+        for box_type, start, end in _mp4_boxes(buf, 0, len(buf))
+        if box_type == b"mdat"
+    ]
+    if not ranges:
+        raise Unsupported("missing MP4 box b'mdat'")
+    return ranges
+
+
+def _wav_ranges(buf: mmap.mmap) -> list[tuple[int, int]]:
+    if buf[:4] != b"RIFF" or buf[8:12] != b"WAVE":
+        raise Unsupported("not a WAV file")
+    pos = 12
+    while pos + 8 <= len(buf):
+        chunk_id = buf[pos : pos + 4]
+        size = struct.unpack("<I", buf[pos + 4 : pos + 8])[0]
+        if chunk_id == b"data":
+            return [(pos + 8, min(pos + 8 + size, len(buf)))]
+        pos += 8 + size + (size & 1)
+    raise Unsupported("missing WAV data chunk")
+
+
+def find_duplicates(
+    paths: Iterable[Path],
+    index: LibraryIndex | None = None,
+    workers: int = 1,
+    on_hashed: Callable[[Path], None] | None = None,
+) -> list[list[Path]]:
+    """Find the music files sharing the same audio payload.
+
+    Files are hashed with hash_audio(), concurrently if more than one worker
+    is given. Hashes are stored in the library index against the stat
+    signature of each file, so only new or modified files are hashed again.
+
+    Args:
+        paths: Paths of the music files to compare.
+        index: Optional library index caching the audio hashes.
+        workers: Number of concurrent hashing threads.
+        on_hashed: Optional callback called with each path once hashed.
+
+    Returns:
+        list[list[Path]]: The groups of duplicate files, each sorted by path,
+            sorted by their first path.
+    """
+
+    def get_hash(path: Path) -> tuple[Path, str | None]:
+        audio_hash = index.lookup_hash(path) if index is not None else None
+        if audio_hash is None:
+            audio_hash = hash_audio(path)
+            if audio_hash is not None and index is not None:
+                index.store_hash(path, audio_hash)
+        if on_hashed is not None:
+            on_hashed(path)
+        return path, audio_hash
+
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            hashes = list(pool.map(get_hash, paths))
+    else:
+        hashes = [get_hash(path) for path in paths]
+
+    groups: dict[str, list[Path]] = defaultdict(list)
+    for path, audio_hash in hashes:
+        if audio_hash is not None:
+            groups[audio_hash].append(path)
+    return sorted(sorted(group) for group in groups.values() if len(group) > 1)
@@ -0,0 +1,348 @@
+import mmap
+import re
+import struct
+from pathlib import Path
+
+from mutagen.id3 import TCON, ID3TimeStamp
+
+from local_files.types import AudioTags
+
+# How far after the ID3v2 tag to look for the first MPEG frame
+MPEG_SYNC_WINDOW = 64 * 1024
+
+# MPEG audio layer III bitrates (kbps), by bitrate index
+MPEG1_L3_BITRATES = (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320)
+MPEG2_L3_BITRATES = (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+
+# MPEG sample rates, by version bits then sample rate index
+MPEG_SAMPLE_RATES = {
+    3: (44100, 48000, 32000),  # MPEG 1
+    2: (22050, 24000, 16000),  # MPEG 2
+    0: (11025, 12000, 8000),  # MPEG 2.5
+}
+
+ID3_TEXT_ENCODINGS = {0: "latin-1", 1: "utf-16", 2: "utf-16-be", 3: "utf-8"}
+
+MP4_TEXT_ATOMS = {
+    b"\xa9ART": "artist",
+    b"\xa9nam": "title",
+    b"\xa9gen": "genre",
+    b"\xa9day": "date",
+}
+
+
+class Unsupported(Exception):
+    """Raised when a file needs the full mutagen parser."""
+
+
+def read_tags_fast(path: Path) -> AudioTags | None:
+    """Read the tags of a music file by decoding only its metadata regions.
+
+    The file is memory-mapped and only the bytes needed are touched: the
+    ID3v2 tag and first MPEG frame header of MP3 files, the metadata blocks
+    of FLAC files, and the box headers leading to `moov/udta/meta/ilst` and
+    the audio track header of M4A files. The audio data is never read.
+
+    Args:
+        path: Path to the music file to read.
+
+    Returns:
+        AudioTags | None: The extracted tags, or None if the file is of
+            another format or uses a feature (unsynchronisation, compressed
+            frames, ID3v1 merging, non UTF-8 atoms...) left to mutagen.
+    """
+    suffix = path.suffix.lower()
+    if suffix not in (".mp3", ".flac", ".m4a"):
+        return None
+
+    try:
+        with (
+            open(path, "rb") as f,
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf,
+        ):
+            tags: AudioTags = {
+                "artist": "",
+                "title": "",
+                "genre": "",
+                "date": "",
+                "cover": False,
+                "isrc": "",
+                "duration": 0.0,
+            }
+            if suffix == ".mp3":
+                _parse_mp3(buf, tags)
+            elif suffix == ".flac":
+                _parse_flac(buf, tags)
+            else:
+                _parse_mp4(buf, tags)
+            return tags
+    except (Unsupported, OSError, ValueError, IndexError, struct.error):
+        return None
+
+
+def _syncsafe(data: bytes) -> int:
+    if any(b & 0x80 for b in data):
+        raise Unsupported("invalid syncsafe integer")
+    value = 0
+    for b in data:
+        value = (value << 7) | b
+    return value
+
+
+def _id3_text(data: bytes) -> list[str]:
+    encoding = ID3_TEXT_ENCODINGS.get(data[0]) if data else None
+    if encoding is None:
+        raise Unsupported("unknown text encoding")
+    return data[1:].decode(encoding).rstrip("\x00").split("\x00")
+
+
+def _parse_mp3(buf: mmap.mmap, tags: AudioTags) -> None:
+    if buf[:3] != b"ID3":
+        raise Unsupported("no ID3v2 tag")
+    major, flags = buf[3], buf[5]
+    if major not in (3, 4) or flags & 0xC0:
+        # ID3v2.2, unsynchronisation and extended headers are left to mutagen
+        raise Unsupported("unsupported ID3v2 tag")
+    tag_end = 10 + _syncsafe(buf[6:10])
+    frames_end = tag_end
+    if major == 4 and flags & 0x10:
+        tag_end += 10  # footer
+    if tag_end > len(buf):
+        raise Unsupported("truncated ID3v2 tag")
+
+    frames: dict[str, list[str]] = {}
+    pos = 10
+    while pos + 10 <= frames_end:
+        frame_id = buf[pos : pos + 4]
+        if frame_id[0] == 0:
+            break  # padding
+        if major == 4:
+            size = _syncsafe(buf[pos + 4 : pos + 8])
+        else:
+            size = struct.unpack(">I", buf[pos + 4 : pos + 8])[0]
+        frame_flags = struct.unpack(">H", buf[pos + 8 : pos + 10])[0]
+        start, pos = pos + 10, pos + 10 + size
+        if pos > frames_end:
+            raise Unsupported("truncated ID3v2 frame")
+
+        name = frame_id.decode("latin-1")
+        if name == "APIC":
+            tags["cover"] = True
+        elif name in ("TPE1", "TIT2", "TCON", "TDRC", "TYER", "TSRC", "TDAT", "TIME"):
+            # Compression, encryption and grouping identity add data before
+            # the text (and unsynchronisation, data length indicator in v2.4)
+            unsupported = 0x00E0 if major == 3 else 0x004F
+            if frame_flags & unsupported:
+                raise Unsupported("compressed, encrypted or grouped frame")
+            frames.setdefault(name, _id3_text(buf[start:pos]))
+
+    if "TDAT" in frames or "TIME" in frames:
+        raise Unsupported("ID3v2.3 date spread over several frames")
+
+    if frames.get("TPE1"):
+        tags["artist"] = frames["TPE1"][0]
+    if frames.get("TIT2"):
+        tags["title"] = frames["TIT2"][0]
+    if frames.get("TCON"):
+        genres = TCON(encoding=3, text=frames["TCON"]).genres
+        if genres:
+            tags["genre"] = genres[0]
+    if frames.get("TDRC"):
+        tags["date"] = ID3TimeStamp(frames["TDRC"][0]).text
+    elif frames.get("TYER") and re.match(
+        r"[0-9]{4}(-[0-9]{2}-[0-9]{2})?\Z", frames["TYER"][0]
+    ):
+        tags["date"] = ID3TimeStamp(frames["TYER"][0]).text
+    if frames.get("TSRC"):
+        tags["isrc"] = frames["TSRC"][0]
+
+    # mutagen completes missing ID3v2 frames from an ID3v1 tag
+    missing = not (tags["artist"] and tags["title"] and tags["genre"] and tags["date"])
+    if missing and len(buf) >= 128 and buf[-128:-125] == b"TAG":
+        raise Unsupported("ID3v1 tag to merge")
+
+    tags["duration"] = _mpeg_duration(buf, tag_end)
+
+
+def _mpeg_duration(buf: mmap.mmap, start: int) -> float:
+    """Compute the duration from the first MPEG layer III frame header."""
+    end = min(len(buf) - 4, start + MPEG_SYNC_WINDOW)
+    pos = buf.find(b"\xff", start, end)
+    while pos != -1:
+        b2, b3, b4 = buf[pos + 1], buf[pos + 2], buf[pos + 3]
+        version, layer = (b2 >> 3) & 0x03, (b2 >> 1) & 0x03
+        bitrate_index, rate_index = b3 >> 4, (b3 >> 2) & 0x03
+        if (
+            b2 & 0xE0 == 0xE0
+            and version != 1
+            and layer == 1
+            and 0 < bitrate_index < 15
+            and rate_index < 3
+        ):
+            break
+        pos = buf.find(b"\xff", pos + 1, end)
+    else:
+        raise Unsupported("no MPEG layer III frame found")
+
+    mono = (b4 >> 6) == 3
+    sample_rate = MPEG_SAMPLE_RATES[version][rate_index]
+    samples_per_frame = 1152 if version == 3 else 576
+
+    # VBR files carry the total number of frames in a Xing/Info or VBRI header
+    if version == 3:
+        xing = pos + 4 + (17 if mono else 32)
+    else:
+        xing = pos + 4 + (9 if mono else 17)
+    if buf[xing : xing + 4] in (b"Xing", b"Info"):
+        xing_flags = struct.unpack(">I", buf[xing + 4 : xing + 8])[0]
+        if xing_flags & 0x01:
+            frames = struct.unpack(">I", buf[xing + 8 : xing + 12])[0]
+            return frames * samples_per_frame / sample_rate
+    if buf[pos + 36 : pos + 40] == b"VBRI":
+        frames = struct.unpack(">I", buf[pos + 50 : pos + 54])[0]
+        return frames * samples_per_frame / sample_rate
+
+    # Otherwise assume a constant bitrate
+    if version == 3:
+        bitrate = MPEG1_L3_BITRATES[bitrate_index] * 1000
+    else:
+        bitrate = MPEG2_L3_BITRATES[bitrate_index] * 1000
+    audio_size = len(buf) - pos
+    if len(buf) >= 128 and buf[-128:-125] == b"TAG":
+        audio_size -= 128
+    return audio_size * 8 / bitrate
+
+
+def _parse_flac(buf: mmap.mmap, tags: AudioTags) -> None:
+    if buf[:4] != b"fLaC":
+        raise Unsupported("no FLAC header")
+
+    pos, last = 4, False
+    while not last:
+        header = buf[pos]
+        last, block_type = bool(header & 0x80), header & 0x7F
+        size = int.from_bytes(buf[pos + 1 : pos + 4], "big")
+        start, pos = pos + 4, pos + 4 + size
+        if pos > len(buf) or block_type == 127:
+            raise Unsupported("invalid FLAC metadata block")
+
+        if block_type == 0:
+            data = buf[start:pos]
+            sample_rate = (data[10] << 12) | (data[11] << 4) | (data[12] >> 4)
+            total_samples = ((data[13] & 0x0F) << 32) | int.from_bytes(
+                data[14:18], "big"
+            )
+            if sample_rate:
+                tags["duration"] = total_samples / sample_rate
+        elif block_type == 4:
+            _parse_vorbis_comments(buf[start:pos], tags)
+        elif block_type == 6:
+            tags["cover"] = True
+
+
+def _parse_vorbis_comments(data: bytes, tags: AudioTags) -> None:
+    vendor_length = struct.unpack("<I", data[:4])[0]
+    pos = 4 + vendor_length
+    count = struct.unpack("<I", data[pos : pos + 4])[0]
+    pos += 4
+    for _ in range(count):
+        length = struct.unpack("<I", data[pos : pos + 4])[0]
+        comment = data[pos + 4 : pos + 4 + length].decode("utf-8", "replace")
+        pos += 4 + length
+        key, sep, value = comment.partition("=")
+        key = key.lower()
+        if not sep:
+            continue
+        if key in ("artist", "title", "genre", "date", "isrc") and not tags[key]:
+            tags[key] = value
+        elif key == "metadata_block_picture":
+            tags["cover"] = True
+
+
+def _mp4_boxes(buf: mmap.mmap, start: int, end: int):
+    """Yield (type, payload start, payload end) of the boxes in a region."""
+    pos = start
+    while pos + 8 <= end:
+        size = struct.unpack(">I", buf[pos : pos + 4])[0]
+        box_type = buf[pos + 4 : pos + 8]
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", buf[pos + 8 : pos + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            raise Unsupported("invalid MP4 box")
+        yield box_type, pos + header, pos + size
+        pos += size
+
+
+def _mp4_child(
+    buf: mmap.mmap, start: int, end: int, box_type: bytes
+) -> tuple[int, int]:
+    for child_type, child_start, child_end in _mp4_boxes(buf, start, end):
+        if child_type == box_type:
+            return child_start, child_end
+    raise Unsupported(f"missing MP4 box {box_type!r}")
+
+
+def _parse_mp4(buf: mmap.mmap, tags: AudioTags) -> None:
+    moov = _mp4_child(buf, 0, len(buf), b"moov")
+
+    # Duration of the first audio track, like mutagen
+    for box_type, start, end in _mp4_boxes(buf, *moov):
+        if box_type != b"trak":
+            continue
+        mdia = _mp4_child(buf, start, end, b"mdia")
+        hdlr_start, _ = _mp4_child(buf, *mdia, b"hdlr")
+        if buf[hdlr_start + 8 : hdlr_start + 12] != b"soun":
+            continue
+        mdhd_start, _ = _mp4_child(buf, *mdia, b"mdhd")
+        if buf[mdhd_start] == 1:
+            timescale, duration = struct.unpack(
+                ">IQ", buf[mdhd_start + 20 : mdhd_start + 32]
+            )
+        else:
+            timescale, duration = struct.unpack(
+                ">II", buf[mdhd_start + 12 : mdhd_start + 20]
+            )
+        if timescale:
+            tags["duration"] = duration / timescale
+        break
+    else:
+        raise Unsupported("no audio track")
+
+    try:
+        udta = _mp4_child(buf, *moov, b"udta")
+        meta_start, meta_end = _mp4_child(buf, *udta, b"meta")
+    except Unsupported:
+        return  # no tags
+    # meta is a full box, except in some QuickTime files
+    if buf[meta_start + 4 : meta_start + 8] != b"hdlr":
+        meta_start += 4
+    try:
+        ilst = _mp4_child(buf, meta_start, meta_end, b"ilst")
+    except Unsupported:
+        return
+
+    for item_type, start, end in _mp4_boxes(buf, *ilst):
+        if item_type == b"covr":
+            tags["cover"] = True
+        elif item_type == b"gnre":
+            raise Unsupported("ID3v1 genre index")
+        elif item_type in MP4_TEXT_ATOMS:
+            data_start, data_end = _mp4_child(buf, start, end, b"data")
+            if int.from_bytes(buf[data_start + 1 : data_start + 4], "big") != 1:
+                raise Unsupported("non UTF-8 text atom")
+            tags[MP4_TEXT_ATOMS[item_type]] = buf[data_start + 8 : data_end].decode(
+                "utf-8"
+            )
+        elif item_type == b"----":
+            mean_start, mean_end = _mp4_child(buf, start, end, b"mean")
+            name_start, name_end = _mp4_child(buf, start, end, b"name")
+            if (
+                buf[mean_start + 4 : mean_end] == b"com.apple.iTunes"
+                and buf[name_start + 4 : name_end] == b"ISRC"
+            ):
+                data_start, data_end = _mp4_child(buf, start, end, b"data")
+                tags["isrc"] = buf[data_start + 8 : data_end].decode("utf-8", "replace")
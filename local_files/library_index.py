@@ -0,0 +1,186 @@
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+from local_files.types import AudioTags
+
+INDEX_PATH = Path("local_files") / "library_index.db"
+
+# Bumped whenever the table layout changes, older indexes are then rebuilt
+SCHEMA_VERSION = 2
+
+# Tag columns cached for each file, named after the AudioTags keys
+INDEX_COLUMNS = ("artist", "title", "genre", "date", "cover", "isrc", "duration")
+
+# Number of writes buffered before committing to disk
+COMMIT_EVERY = 500
+
+
+class LibraryIndex:
+    """Persistent SQLite index of the tags extracted from local music files.
+
+    Each row is keyed by the file path and stores the stat signature of the
+    file (size, mtime, inode) next to the extracted tags. A cached row is only
+    used while the signature still matches the file on disk, so files are
+    parsed again with mutagen only when they have changed. The audio hashes
+    used to find duplicate files are cached the same way.
+
+    Attributes:
+        db_path: Path of the SQLite database file.
+        hits: Number of files restored from the index.
+        misses: Number of files that had to be parsed.
+    """
+
+    def __init__(
+        self, db_path: Path = INDEX_PATH, commit_every: int = COMMIT_EVERY
+    ) -> None:
+        self.db_path: Path = db_path
+        self.hits: int = 0
+        self.misses: int = 0
+        self._commit_every: int = commit_every
+        self._pending: int = 0
+        # The connection is shared by scanning threads, and the WAL journal lets
+        # several scanning processes read and write the same index file.
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(db_path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self._conn.execute("DROP TABLE IF EXISTS files")
+            self._conn.execute("DROP TABLE IF EXISTS audio_hashes")
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                artist TEXT NOT NULL,
+                title TEXT NOT NULL,
+                genre TEXT NOT NULL,
+                date TEXT NOT NULL,
+                cover INTEGER NOT NULL,
+                isrc TEXT NOT NULL,
+                duration REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS audio_hashes (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                audio_hash TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def __enter__(self) -> "LibraryIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @staticmethod
+    def signature(path: Path) -> tuple[int, int, int] | None:
+        """Return the (size, mtime_ns, inode) stat signature of a file."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns, st.st_ino
+
+    def lookup(self, path: Path) -> AudioTags | None:
+        """Return the indexed tags of a file.
+
+        Returns:
+            AudioTags | None: The tags if an up-to-date row was found, None if
+                the file has to be parsed.
+        """
+        signature = self.signature(path)
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT size, mtime_ns, inode, {', '.join(INDEX_COLUMNS)} "
+                "FROM files WHERE path = ?",
+                (str(path),),
+            ).fetchone()
+            if signature is None or row is None or tuple(row[:3]) != signature:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        tags = dict(zip(INDEX_COLUMNS, row[3:]))
+        tags["cover"] = bool(tags["cover"])
+        return tags  # type: ignore[return-value]
+
+    def store(self, path: Path, tags: AudioTags) -> None:
+        """Store the tags freshly extracted from a file."""
+        signature = self.signature(path)
+        if signature is None:
+            return
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO files (path, size, mtime_ns, inode, "
+                f"{', '.join(INDEX_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * (4 + len(INDEX_COLUMNS)))})",
+                (str(path), *signature, *(tags[c] for c in INDEX_COLUMNS)),
+            )
+            self._pending += 1
+            if self._pending >= self._commit_every:
+                self.commit()
+
+    def lookup_hash(self, path: Path) -> str | None:
+        """Return the indexed audio hash of a file, if still up to date."""
+        signature = self.signature(path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, inode, audio_hash "
+                "FROM audio_hashes WHERE path = ?",
+                (str(path),),
+            ).fetchone()
+        if signature is None or row is None or tuple(row[:3]) != signature:
+            return None
+        return row[3]
+
+    def store_hash(self, path: Path, audio_hash: str) -> None:
+        """Store the freshly computed audio hash of a file."""
+        signature = self.signature(path)
+        if signature is None:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO audio_hashes "
+                "(path, size, mtime_ns, inode, audio_hash) VALUES (?, ?, ?, ?, ?)",
+                (str(path), *signature, audio_hash),
+            )
+            self._pending += 1
+            if self._pending >= self._commit_every:
+                self.commit()
+
+    def move(self, old_path: Path, new_path: Path) -> None:
+        """Follow a renamed file, which keeps its stat signature."""
+        with self._lock:
+            for table in ("files", "audio_hashes"):
+                self._conn.execute(
+                    f"DELETE FROM {table} WHERE path = ?", (str(new_path),)
+                )
+                self._conn.execute(
+                    f"UPDATE {table} SET path = ? WHERE path = ?",
+                    (str(new_path), str(old_path)),
+                )
+            self._pending += 1
+            if self._pending >= self._commit_every:
+                self.commit()
+
+    def commit(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._pending = 0
+
+    def close(self) -> None:
+        self.commit()
+        self._conn.close()
@@ -1,13 +1,13 @@
+import sys
 from pathlib import Path
-from mutagen.easyid3 import EasyID3
-from mutagen.flac import FLAC
-from mutagen.mp4 import MP4
-from mutagen.oggvorbis import OggVorbis
-from mutagen.wave import WAVE
-from mutagen._file import File
-from mutagen.id3._util import ID3NoHeaderError
+from typing import TYPE_CHECKING
 
 from local_files.logger import logger
+from local_files.tag_reader import read_tags
+from local_files.types import AudioTags
+
+if TYPE_CHECKING:
+    from local_files.library_index import LibraryIndex
 
 
 class MusicFile:
@@ -16,124 +16,113 @@ class MusicFile:
     This class provides a unified interface for reading artist and title tags
     from various audio file formats including MP3, FLAC, and M4A.
 
+    Tags are loaded lazily: creating a MusicFile costs no file I/O, the tags
+    are read (or restored from the library index) the first time one of the
+    tag attributes is accessed, then cached.
+
     Attributes:
         path: The file path of the music file.
         suffix: The file extension (e.g., '.mp3', '.flac').
         artist: The artist name extracted from the file tags.
         title: The track title extracted from the file tags.
+        isrc: The ISRC code extracted from the file tags, if any.
+        duration: The duration of the track in seconds.
     """
 
-    def __init__(self, path: Path) -> None:
-        """Initialize a MusicFile instance and extract metadata.
+    # No per-instance __dict__, whole libraries are held in memory
+    __slots__ = (
+        "path",
+        "suffix",
+        "_index",
+        "_loaded",
+        "_artist",
+        "_title",
+        "_isrc",
+        "_duration",
+    )
+
+    def __init__(self, path: Path, index: "LibraryIndex | None" = None) -> None:
+        """Initialize a MusicFile instance, without reading the file.
 
         Args:
             path: Path to the music file to process.
-
-        Note:
-            Automatically calls _get_tags() to extract artist and title
-            information from the file upon initialization.
+            index: Optional library index consulted before reading the file.
+                It must stay open until the tags are loaded.
         """
         self.path: Path = path
         self.suffix: str = path.suffix
-        self.artist: str = ""
-        self.title: str = ""
-        self._get_tags()
-
-    def _get_tags(self) -> None:
-        """Extract artist and title tags from music files.
-
-        Reads metadata from the music file based on its format. Supports
-        FLAC, MP3, M4A, OGG, and WAV files. Sets the artist and title attributes
-        if the tags are successfully read.
-
-        Note:
-            - FLAC: Reads from FLAC metadata tags
-            - MP3: Uses EasyID3 first (more reliable), then falls back to generic ID3 tags
-            - M4A: Reads from MP4 metadata tags
-            - OGG: Reads from Ogg Vorbis tags
-            - WAV: Reads from WAV metadata tags (limited support)
-            - Generic fallback: Uses mutagen.File for any format
-            - Logs errors if tag reading fails for any format
+        self._index: "LibraryIndex | None" = index
+        self._loaded: bool = False
+        self._artist: str = ""
+        self._title: str = ""
+        self._isrc: str = ""
+        self._duration: float = 0.0
+
+    def load(self) -> None:
+        """Load the tags of the file, if not done yet.
+
+        Calls _get_tags() to extract the tags from the file, unless the index
+        holds up-to-date tags for this file.
+        """
+        if self._loaded:
+            return
+        self._loaded = True
+
+        index, self._index = self._index, None
+        tags = index.lookup(self.path) if index is not None else None
+        if tags is None:
+            tags = self._get_tags()
+            if index is not None:
+                index.store(self.path, tags)
+        self._apply_tags(tags)
+
+    @property
+    def artist(self) -> str:
+        self.load()
+        return self._artist
+
+    @artist.setter
+    def artist(self, value: str) -> None:
+        self.load()
+        self._artist = value
+
+    @property
+    def title(self) -> str:
+        self.load()
+        return self._title
+
+    @title.setter
+    def title(self, value: str) -> None:
+        self.load()
+        self._title = value
+
+    @property
+    def isrc(self) -> str:
+        self.load()
+        return self._isrc
+
+    @property
+    def duration(self) -> float:
+        self.load()
+        return self._duration
+
+    def _get_tags(self) -> AudioTags:
+        """Extract the tags from the music file.
+
+        The file is opened only once, see read_tags() for the supported
+        formats and the tags that are extracted.
+        """
+        return read_tags(self.path)
+
+    def _apply_tags(self, tags: AudioTags) -> None:
+        """Set the attributes of the music file from its extracted tags.
+
+        Artist and title are only set if both are present.
         """
-        # Try format-specific handlers first
-        if self.suffix == ".flac":
-            try:
-                audio = FLAC(self.path)
-                if audio.get("artist") and audio.get("title"):
-                    self.artist = audio["artist"][0]
-                    self.title = audio["title"][0]
-                    return
-            except Exception as e:
-                logger.error(f"Error reading FLAC tags: {e}")
-
-        elif self.suffix == ".mp3":
-            # Try EasyID3 first (more reliable for MP3)
-            try:
-                tags = EasyID3(self.path)
-                if tags is not None:
-                    artist = tags.get("artist", [""])[0]
-                    title = tags.get("title", [""])[0]
-                    if artist and title:
-                        self.artist = artist
-                        self.title = title
-                        return
-            except ID3NoHeaderError:
-                pass
-            except Exception as e:
-                logger.error(f"Error reading MP3 EasyID3 tags: {e}")
-
-        elif self.suffix == ".m4a":
-            try:
-                audio = MP4(self.path)
-                if audio.get("\xa9ART") and audio.get("\xa9nam"):
-                    self.artist = audio["\xa9ART"][0]
-                    self.title = audio["\xa9nam"][0]
-                    return
-            except Exception as e:
-                logger.error(f"Error reading M4A tags: {e}")
-
-        elif self.suffix == ".ogg":
-            try:
-                audio = OggVorbis(self.path)
-                if audio.get("artist") and audio.get("title"):
-                    self.artist = audio["artist"][0]
-                    self.title = audio["title"][0]
-                    return
-            except Exception as e:
-                logger.error(f"Error reading OGG tags: {e}")
-
-        elif self.suffix == ".wav":
-            try:
-                audio = WAVE(self.path)
-                # WAV files typically don't have embedded metadata tags
-                # This will likely result in empty artist/title
-                if hasattr(audio, "tags") and audio.tags:
-                    # Try to extract any available metadata
-                    pass
-            except Exception as e:
-                logger.error(f"Error reading WAV tags: {e}")
-
-        # Generic fallback using mutagen.File
-        try:
-            audio = File(self.path)
-            if audio is None:
-                logger.error(f"Could not read audio file: {self.path}")
-                return
-
-            # Try generic tags
-            if hasattr(audio, "tags") and audio.tags is not None:
-                try:
-                    artist = audio.tags.get("TPE1", [""])[0]
-                    title = audio.tags.get("TIT2", [""])[0]
-                    if artist and title:
-                        self.artist = artist
-                        self.title = title
-                        return
-                except (IndexError, TypeError):
-                    pass
-
-        except Exception as e:
-            logger.error(f"Error reading generic tags from {self.path}: {e}")
-
-        # If we get here, we couldn't extract tags
-        logger.warning(f"Missing artist or title tags in: {self.path}")
+        if tags["artist"] and tags["title"]:
+            self._artist = sys.intern(tags["artist"])
+            self._title = tags["title"]
+        else:
+            logger.warning(f"Missing artist or title tags in: {self.path}")
+        self._isrc = tags["isrc"]
+        self._duration = tags["duration"]
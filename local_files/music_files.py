@@ -1,21 +1,180 @@
+import os
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
+from local_files.library_index import LibraryIndex
 from local_files.music_file import MusicFile
+from local_files.shard import Shard
 
 AUDIO_FILES_EXTENSIONS = {".mp3", ".m4a", ".flac", ".ogg", ".wav"}
 
+# Number of files read ahead of the consumer by iter_music_files, per worker
+PREFETCH_PER_WORKER = 4
+
+# Library index opened by each worker of the process pool
+_worker_index: LibraryIndex | None = None
+
+
+def _init_worker(index_path: Path | None) -> None:
+    """Open a dedicated library index connection in a pool worker process."""
+    global _worker_index
+    if index_path is not None:
+        # Commit every row so that nothing is lost when the worker exits
+        _worker_index = LibraryIndex(index_path, commit_every=1)
+
+
+def _read_music_file(path: Path) -> MusicFile:
+    music_file = MusicFile(path, index=_worker_index)
+    music_file.load()
+    return music_file
+
+
+def read_music_files(
+    paths: Iterable[Path],
+    factory: Callable[..., MusicFile] = MusicFile,
+    index: LibraryIndex | None = None,
+    workers: int = 1,
+    processes: bool = False,
+) -> list[MusicFile]:
+    """Read the tags of music files, optionally with a pool of workers.
+
+    Tag extraction is mostly waiting on I/O, so a thread pool lets the reads
+    overlap, especially on network storage. The process pool is meant for
+    CPU-bound parsing (e.g. large MP4 atom trees) and only builds plain
+    MusicFile instances, as the factory has to be shared with the workers.
+
+    Args:
+        paths: Paths of the music files to read.
+        factory: Callable building a MusicFile (or subclass) from a path and
+            an optional `index` keyword argument.
+        index: Optional library index consulted before reading each file.
+        workers: Number of concurrent workers, 1 reads the files serially.
+        processes: Use a process pool instead of a thread pool.
+
+    Returns:
+        list[MusicFile]: The music files, in the order of the given paths.
+    """
+
+    def read(path: Path) -> MusicFile:
+        music_file = factory(path, index=index)
+        music_file.load()
+        return music_file
+
+    paths = list(paths)
+    if workers <= 1 or len(paths) <= 1:
+        return [read(path) for path in paths]
+
+    if processes:
+        if factory is not MusicFile:
+            raise ValueError("Process pool scanning only supports MusicFile")
+        # Each worker process opens its own connection to the index file
+        if index is not None:
+            index.commit()
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(index.db_path if index is not None else None,),
+        ) as pool:
+            return list(pool.map(_read_music_file, paths, chunksize=32))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(read, paths))
+
+
+def iter_music_files(
+    paths: Iterable[Path],
+    factory: Callable[..., MusicFile] = MusicFile,
+    index: LibraryIndex | None = None,
+    workers: int = 1,
+) -> Iterator[MusicFile]:
+    """Yield music files with their tags read, as soon as each is ready.
+
+    Streaming counterpart of read_music_files: the paths are consumed lazily
+    and the files are yielded in the order of the given paths. With more
+    than one worker, a bounded number of files are read ahead by a thread
+    pool, so memory use doesn't depend on the number of files.
+
+    Args:
+        paths: Paths of the music files to read, consumed by the calling thread.
+        factory: Callable building a MusicFile (or subclass) from a path and
+            an optional `index` keyword argument.
+        index: Optional library index consulted before reading each file.
+        workers: Number of concurrent reading threads.
+    """
+
+    def read(path: Path) -> MusicFile:
+        music_file = factory(path, index=index)
+        music_file.load()
+        return music_file
+
+    if workers <= 1:
+        for path in paths:
+            yield read(path)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for path in paths:
+            pending.append(pool.submit(read, path))
+            if len(pending) >= workers * PREFETCH_PER_WORKER:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def iter_music_paths(directory: Path, recursive: bool = True) -> Iterator[Path]:
+    """Yield the paths of the music files in directory, as they are found.
+
+    Directories are listed with os.scandir, whose entries carry the file type
+    returned by the OS, so no extra stat call is needed per file. Entries are
+    sorted within each directory, so paths come out in a stable path order.
+    Symlinks to directories are not followed.
+    """
+    try:
+        with os.scandir(directory) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+    except OSError:
+        return
+
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                if recursive:
+                    yield from iter_music_paths(Path(entry.path), recursive)
+            elif (
+                entry.is_file()
+                and os.path.splitext(entry.name)[1].lower() in AUDIO_FILES_EXTENSIONS
+            ):
+                yield Path(entry.path)
+        except OSError:
+            continue
+
+
+def get_music_files(
+    directory: Path,
+    recursive: bool = True,
+    index: LibraryIndex | None = None,
+    workers: int = 1,
+    processes: bool = False,
+    shard: Shard | None = None,
+) -> list[MusicFile]:
+    """Get all music files in directory and optionally subdirectories.
+
+    If a library index is given, tags of files unchanged since they were
+    indexed are read from it instead of from the files themselves. With
+    more than one worker, tags are read concurrently (see read_music_files).
+    With a shard, only the files of this shard are read.
+    """
+    paths = iter_music_paths(directory, recursive)
+    if shard is not None:
+        paths = shard.filter(paths, directory)
+    music_files = read_music_files(
+        paths,
+        index=index,
+        workers=workers,
+        processes=processes,
+    )
 
-def get_music_files(directory: Path, recursive: bool = True) -> list[MusicFile]:
-    """Get all music files in directory and optionally subdirectories."""
-    if recursive:
-        files = directory.rglob("*")
-    else:
-        files = directory.glob("*")
-    
-    music_files = [
-        MusicFile(f)
-        for f in files
-        if f.is_file() and f.suffix.lower() in AUDIO_FILES_EXTENSIONS
-    ]
-    
     # Sort files alphabetically by name (case-insensitive)
     return sorted(music_files, key=lambda x: x.path.name.lower())
@@ -18,6 +18,14 @@ def sanitize_filename(filename: str) -> str:
     return re.sub(invalid_chars, "_", filename)
 
 
+def target_filename(music_file: MusicFile) -> str:
+    """Return the 'artist - title.ext' file name of a music file."""
+    # Sanitize artist and title
+    artist = sanitize_filename(music_file.artist)
+    title = sanitize_filename(music_file.title)
+    return f"{artist} - {title}{music_file.suffix}"
+
+
 def rename_file(music_file: MusicFile, confirm: bool = True) -> tuple[bool, bool]:
     """Rename file to 'artist - title.ext' format
 
@@ -29,12 +37,8 @@ def rename_file(music_file: MusicFile, confirm: bool = True) -> tuple[bool, bool
         tuple[bool, bool]: (was_renamed, was_skipped)
     """
     try:
-        # Sanitize artist and title
-        artist = sanitize_filename(music_file.artist)
-        title = sanitize_filename(music_file.title)
-
         # Create new filename
-        new_name = f"{artist} - {title}{music_file.suffix}"
+        new_name = target_filename(music_file)
         new_path = music_file.path.parent / new_name
 
         # Skip if filename is already correct
@@ -64,6 +68,7 @@ def rename_file(music_file: MusicFile, confirm: bool = True) -> tuple[bool, bool
         # Rename file
         music_file.path.rename(new_path)
         logger.success(f"Renamed: {music_file.path.name} -> {new_name}")
+        music_file.path = new_path
         return True, False
 
     except Exception as e:
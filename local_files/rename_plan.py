@@ -0,0 +1,167 @@
+import csv
+import errno
+import os
+from collections import Counter, defaultdict
+from collections.abc import Iterable
+from pathlib import Path
+from typing import NamedTuple
+
+from local_files.library_index import LibraryIndex
+from local_files.logger import logger
+from local_files.music_file import MusicFile
+from local_files.rename_file import target_filename
+
+PLAN_PATH = Path("local_files") / "rename_plan.tsv"
+
+# Status of the files in a rename plan
+RENAME = "rename"
+ALREADY_NAMED = "already_named"
+COLLISION = "collision"
+MISSING_TAGS = "missing_tags"
+
+
+class RenamePlanEntry(NamedTuple):
+    status: str
+    source: Path
+    target: Path | None
+
+
+def plan_renames(music_files: Iterable[MusicFile]) -> list[RenamePlanEntry]:
+    """Plan the renaming of music files to the 'artist - title.ext' format.
+
+    Each directory is listed once to build an index of the names it holds,
+    then collisions with existing files and between files of the batch are
+    resolved in memory: a file is only planned for renaming if its target
+    name is not taken yet (case-insensitively, to be safe on all file
+    systems), and the target is then reserved for it.
+
+    Args:
+        music_files: The music files to rename.
+
+    Returns:
+        list[RenamePlanEntry]: One entry per music file, sorted by path.
+    """
+    by_directory: dict[Path, list[MusicFile]] = defaultdict(list)
+    for music_file in music_files:
+        by_directory[music_file.path.parent].append(music_file)
+
+    plan: list[RenamePlanEntry] = []
+    for directory in sorted(by_directory):
+        try:
+            taken = {name.casefold() for name in os.listdir(directory)}
+        except OSError as e:
+            logger.error(f"Error listing {directory}: {e}")
+            taken = None
+
+        for music_file in sorted(by_directory[directory], key=lambda f: f.path.name):
+            if not (music_file.artist and music_file.title):
+                plan.append(RenamePlanEntry(MISSING_TAGS, music_file.path, None))
+                continue
+
+            new_name = target_filename(music_file)
+            target = directory / new_name
+            if music_file.path.name == new_name:
+                plan.append(RenamePlanEntry(ALREADY_NAMED, music_file.path, target))
+            elif taken is None or (
+                new_name.casefold() in taken
+                and new_name.casefold() != music_file.path.name.casefold()
+            ):
+                plan.append(RenamePlanEntry(COLLISION, music_file.path, target))
+            else:
+                taken.add(new_name.casefold())
+                plan.append(RenamePlanEntry(RENAME, music_file.path, target))
+    return plan
+
+
+def write_rename_plan(plan: list[RenamePlanEntry], path: Path = PLAN_PATH) -> None:
+    """Write a rename plan as a tab-separated file (status, source, target)."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, delimiter="\t")
+        writer.writerow(["status", "source", "target"])
+        for entry in plan:
+            writer.writerow([entry.status, entry.source, entry.target or ""])
+
+
+def read_rename_plan(path: Path = PLAN_PATH) -> list[RenamePlanEntry]:
+    """Read back a rename plan, including the changes made while reviewing it."""
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f, delimiter="\t")
+        return [
+            RenamePlanEntry(
+                row["status"],
+                Path(row["source"]),
+                Path(row["target"]) if row["target"] else None,
+            )
+            for row in reader
+        ]
+
+
+def apply_rename_plan(
+    plan: list[RenamePlanEntry], index: LibraryIndex | None = None
+) -> tuple[int, int]:
+    """Apply the renames of a plan, checking the targets again first.
+
+    The plan may have been edited, and files may have arrived while it was
+    reviewed, so an entry is refused if its target already exists, or if
+    another entry of the plan has the same target (case-insensitively).
+    Files are moved with a hard link then an unlink, which never replaces
+    an existing file, even one created in the meantime.
+
+    Args:
+        plan: The rename plan, only the "rename" entries are applied.
+        index: Optional library index, whose rows follow the renamed files.
+
+    Returns:
+        tuple[int, int]: (renamed, failed), the refused entries being failed.
+    """
+    entries = [e for e in plan if e.status == RENAME and e.target is not None]
+    targets = Counter(str(e.target).casefold() for e in entries)
+
+    renamed = 0
+    failed = 0
+    for entry in entries:
+        target: Path = entry.target  # type: ignore[assignment]
+        if targets[str(target).casefold()] > 1:
+            logger.error(f"Not renaming {entry.source}: {target} is planned twice")
+            failed += 1
+            continue
+        try:
+            _move(entry.source, target)
+        except FileExistsError:
+            logger.error(f"Not renaming {entry.source}: {target} already exists")
+            failed += 1
+            continue
+        except OSError as e:
+            logger.error(f"Error renaming {entry.source}: {e}")
+            failed += 1
+            continue
+        logger.success(f"Renamed: {entry.source.name} -> {target.name}")
+        if index is not None:
+            index.move(entry.source, target)
+        renamed += 1
+    return renamed, failed
+
+
+def _move(source: Path, target: Path) -> None:
+    """Move a file without ever replacing an existing one.
+
+    Raises:
+        FileExistsError: If the target exists.
+    """
+    if os.path.lexists(target):
+        # Only a change of case on a case-insensitive file system, where the
+        # target is the source itself, can be renamed in place
+        if source.parent == target.parent and os.path.samefile(source, target):
+            os.rename(source, target)
+            return
+        raise FileExistsError(errno.EEXIST, "File exists", str(target))
+    try:
+        os.link(source, target)
+    except OSError as e:
+        if e.errno not in (errno.EPERM, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EXDEV):
+            raise
+        # No hard links on this file system (FAT, some network shares): the
+        # target was checked just above
+        os.rename(source, target)
+        return
+    os.unlink(source)
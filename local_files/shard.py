@@ -0,0 +1,100 @@
+import argparse
+import hashlib
+import json
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import NamedTuple
+
+# Summaries written by the shards of a run, merged by merge_shard_summaries()
+SUMMARIES_PATH = Path("local_files") / "shards"
+
+
+class Shard(NamedTuple):
+    """One of the parts a library run is split into, to run them in parallel.
+
+    Files are assigned to shards by a stable hash of their directory relative
+    to the library root, so that all the shards agree on the partition, even
+    on machines mounting the library at different places, and the tracks of
+    an album stay together in a same shard. Files at the root of the library
+    are assigned one by one.
+
+    Attributes:
+        index: Number of the shard, from 1 to count.
+        count: Number of shards the run is split into.
+    """
+
+    index: int
+    count: int
+
+    @classmethod
+    def parse(cls, value: str) -> "Shard":
+        """Parse a shard given as "i/N", e.g. "2/4" for the 2nd of 4 shards."""
+        try:
+            index, count = (int(part) for part in value.split("/"))
+        except ValueError:
+            index, count = 0, 0
+        if not 1 <= index <= count:
+            raise ValueError(f'Invalid shard "{value}", expected i/N with 1 <= i <= N')
+        return cls(index, count)
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
+
+    @property
+    def suffix(self) -> str:
+        """Suffix of the files written by this shard, e.g. "shard-2-of-4"."""
+        return f"shard-{self.index}-of-{self.count}"
+
+    def contains(self, key: str) -> bool:
+        """Whether the item with the given key belongs to this shard."""
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big") % self.count == self.index - 1
+
+    def filter(self, paths: Iterable[Path], root: Path) -> Iterator[Path]:
+        """Yield the paths belonging to this shard, lazily."""
+        for path in paths:
+            if path.parent == root:
+                key = path.name
+            else:
+                key = path.parent.relative_to(root).as_posix()
+            if self.contains(key):
+                yield path
+
+
+def shard_argument(value: str) -> Shard:
+    """Parse the value of the --shard i/N command line option."""
+    try:
+        return Shard.parse(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from e
+
+
+def shard_from_args(args: list[str] | None = None) -> Shard | None:
+    """Get the shard given with the --shard i/N command line option, if any."""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--shard", type=shard_argument)
+    return parser.parse_known_args(args)[0].shard
+
+
+def write_shard_summary(job: str, shard: Shard, summary: dict[str, int]) -> None:
+    """Write the summary counts of a job run by one shard."""
+    SUMMARIES_PATH.mkdir(parents=True, exist_ok=True)
+    path = SUMMARIES_PATH / f"{job}.{shard.suffix}.json"
+    path.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+
+
+def merge_shard_summaries(job: str) -> tuple[dict[str, int], list[str]]:
+    """Sum the summary counts written by the shards of a job.
+
+    Returns:
+        tuple[dict[str, int], list[str]]: The merged counts, and the shards
+            ("i/N") whose summaries were found.
+    """
+    merged: dict[str, int] = {}
+    shards: list[str] = []
+    for path in sorted(SUMMARIES_PATH.glob(f"{job}.shard-*.json")):
+        for label, count in json.loads(path.read_text(encoding="utf-8")).items():
+            merged[label] = merged.get(label, 0) + count
+        index, _, count = path.suffixes[-2].removeprefix(".shard-").partition("-of-")
+        shards.append(f"{index}/{count}")
+    return merged, shards
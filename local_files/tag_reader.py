@@ -0,0 +1,129 @@
+from pathlib import Path
+
+from mutagen._file import File
+from mutagen._util import MutagenError
+from mutagen._vorbis import VCommentDict
+from mutagen.id3 import ID3
+from mutagen.id3._util import ID3NoHeaderError
+from mutagen.mp4 import MP4Tags
+
+from local_files.fast_tags import read_tags_fast
+from local_files.logger import logger
+from local_files.types import AudioTags
+
+
+def empty_tags() -> AudioTags:
+    return {
+        "artist": "",
+        "title": "",
+        "genre": "",
+        "date": "",
+        "cover": False,
+        "isrc": "",
+        "duration": 0.0,
+    }
+
+
+def read_tags(path: Path) -> AudioTags:
+    """Read all the tags used by this toolbox from a music file, in one pass.
+
+    MP3, FLAC and M4A files are first read with the header-only fast path of
+    read_tags_fast(). Otherwise, the file is opened and parsed once by
+    mutagen, which detects its format, then artist, title, genre, date, cover
+    presence, ISRC and duration are picked from the parsed tags according to
+    the tag format:
+    - ID3 (MP3, WAV): TPE1, TIT2, TCON, TDRC, TSRC and APIC frames
+    - Vorbis comments (FLAC, OGG): artist, title, genre, date, isrc and pictures
+    - MP4 (M4A): ©ART, ©nam, ©gen, ©day, ISRC freeform atom and covr
+
+    Args:
+        path: Path to the music file to read.
+
+    Returns:
+        AudioTags: The extracted tags, with empty values for missing tags.
+    """
+    # Decode only the metadata regions when possible, see read_tags_fast()
+    fast_tags = read_tags_fast(path)
+    if fast_tags is not None:
+        return fast_tags
+
+    tags = empty_tags()
+    try:
+        audio = File(path)
+    except MutagenError as e:
+        # The audio stream may be unreadable while the ID3 tag is fine
+        if path.suffix.lower() != ".mp3":
+            logger.error(f"Error reading tags from {path}: {e}")
+            return tags
+        try:
+            _read_id3(ID3(path), tags)
+        except ID3NoHeaderError:
+            pass
+        except Exception as e:
+            logger.error(f"Error reading MP3 ID3 tags from {path}: {e}")
+        return tags
+    except Exception as e:
+        logger.error(f"Error reading tags from {path}: {e}")
+        return tags
+
+    if audio is None:
+        logger.error(f"Could not read audio file: {path}")
+        return tags
+
+    if audio.info is not None:
+        tags["duration"] = float(getattr(audio.info, "length", 0.0) or 0.0)
+
+    if getattr(audio, "pictures", None):
+        tags["cover"] = True
+    if audio.tags is None:
+        return tags
+    try:
+        if isinstance(audio.tags, ID3):
+            _read_id3(audio.tags, tags)
+        elif isinstance(audio.tags, VCommentDict):
+            _read_vorbis(audio.tags, tags)
+        elif isinstance(audio.tags, MP4Tags):
+            _read_mp4(audio.tags, tags)
+    except Exception as e:
+        logger.error(f"Error reading tags from {path}: {e}")
+    return tags
+
+
+def _read_id3(id3: ID3, tags: AudioTags) -> None:
+    if id3.get("TPE1"):
+        tags["artist"] = str(id3["TPE1"].text[0])
+    if id3.get("TIT2"):
+        tags["title"] = str(id3["TIT2"].text[0])
+    if id3.get("TCON") and id3["TCON"].genres:
+        tags["genre"] = id3["TCON"].genres[0]
+    if id3.get("TDRC"):
+        tags["date"] = id3["TDRC"].text[0].text
+    if id3.get("TSRC"):
+        tags["isrc"] = str(id3["TSRC"].text[0])
+    tags["cover"] = any(key.startswith("APIC") for key in id3.keys())
+
+
+def _read_vorbis(comments: VCommentDict, tags: AudioTags) -> None:
+    for key in ("artist", "title", "genre", "date", "isrc"):
+        values = comments.get(key)
+        if values:
+            tags[key] = values[0]
+    if comments.get("metadata_block_picture"):
+        tags["cover"] = True
+
+
+def _read_mp4(mp4: MP4Tags, tags: AudioTags) -> None:
+    for key, atom in (
+        ("artist", "\xa9ART"),
+        ("title", "\xa9nam"),
+        ("genre", "\xa9gen"),
+        ("date", "\xa9day"),
+    ):
+        if mp4.get(atom):
+            tags[key] = mp4[atom][0]
+    if mp4.get("----:com.apple.iTunes:ISRC"):
+        tags["isrc"] = bytes(mp4["----:com.apple.iTunes:ISRC"][0]).decode(
+            "utf-8", "replace"
+        )
+    if mp4.get("covr"):
+        tags["cover"] = True
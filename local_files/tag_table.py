@@ -0,0 +1,173 @@
+import os
+from array import array
+from collections import Counter, defaultdict
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from itertools import compress
+from pathlib import Path
+from typing import NamedTuple
+
+from local_files.library_index import LibraryIndex
+from local_files.tag_reader import read_tags
+from local_files.types import AudioTags
+
+# Columns whose missing values are reported, with the value meaning missing
+MISSING_VALUES = {
+    "artist": "",
+    "title": "",
+    "genre": "",
+    "year": "",
+    "cover": 0,
+    "isrc": "",
+}
+
+
+class DirectoryStats(NamedTuple):
+    directory: str
+    files: int
+    missing_genre: int
+    missing_year: int
+    missing_cover: int
+    years: tuple[str, ...]
+    duration: float
+
+
+class TagTable:
+    """Columnar in-memory table of the tags of the files of a library.
+
+    Each tag is held in its own column (a list of strings, or a typed array
+    for numbers), row i of every column describing the same file, so that
+    aggregations run over whole columns with the C-implemented builtins
+    (list.count, Counter, zip, compress) instead of per-file Python objects.
+
+    Attributes:
+        path, directory, suffix, artist, title, genre, year, isrc: String columns.
+        cover: 1 if a cover is embedded, 0 otherwise.
+        duration: Duration in seconds.
+    """
+
+    def __init__(self) -> None:
+        self.path: list[str] = []
+        self.directory: list[str] = []
+        self.suffix: list[str] = []
+        self.artist: list[str] = []
+        self.title: list[str] = []
+        self.genre: list[str] = []
+        self.year: list[str] = []
+        self.isrc: list[str] = []
+        self.cover: array = array("b")
+        self.duration: array = array("d")
+
+    def __len__(self) -> int:
+        return len(self.path)
+
+    @classmethod
+    def load(
+        cls,
+        paths: Iterable[Path],
+        index: LibraryIndex | None = None,
+        workers: int = 1,
+    ) -> "TagTable":
+        """Load the tags of music files into a table.
+
+        Tags are restored from the library index when it holds up-to-date
+        tags for a file, and read from the file (then indexed) otherwise.
+
+        Args:
+            paths: Paths of the music files to load.
+            index: Optional library index consulted before reading each file.
+            workers: Number of concurrent reading threads.
+        """
+
+        def get_tags(path: Path) -> tuple[Path, AudioTags]:
+            tags = index.lookup(path) if index is not None else None
+            if tags is None:
+                tags = read_tags(path)
+                if index is not None:
+                    index.store(path, tags)
+            return path, tags
+
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                rows = pool.map(get_tags, paths)
+                table = cls()
+                for path, tags in rows:
+                    table.append(path, tags)
+                return table
+
+        table = cls()
+        for path in paths:
+            table.append(*get_tags(path))
+        return table
+
+    def append(self, path: Path, tags: AudioTags) -> None:
+        """Add the row of a file."""
+        self.path.append(str(path))
+        self.directory.append(os.path.dirname(path))
+        self.suffix.append(path.suffix.lower())
+        self.artist.append(tags["artist"])
+        self.title.append(tags["title"])
+        self.genre.append(tags["genre"])
+        self.year.append(tags["date"][:4])
+        self.isrc.append(tags["isrc"])
+        self.cover.append(1 if tags["cover"] else 0)
+        self.duration.append(tags["duration"])
+
+    def missing(self) -> dict[str, int]:
+        """Count the files missing each tag."""
+        return {
+            column: getattr(self, column).count(value)
+            for column, value in MISSING_VALUES.items()
+        }
+
+    def where(self, **conditions: str | int) -> list[str]:
+        """Return the paths of the files whose columns equal the given values.
+
+        Example: table.where(year="") lists the files without a year.
+        """
+        mask: Iterable[bool] = [True] * len(self)
+        for column, value in conditions.items():
+            mask = [
+                selected and cell == value
+                for selected, cell in zip(mask, getattr(self, column))
+            ]
+        return list(compress(self.path, mask))
+
+    def histogram(self, column: str, limit: int | None = None) -> list[tuple[str, int]]:
+        """Count the files by value of a column, the most common first.
+
+        Empty values are left out. The genre column holds comma separated
+        genres, each of them is counted.
+        """
+        values = getattr(self, column)
+        if column == "genre":
+            counts = Counter(
+                genre.strip() for value in values if value for genre in value.split(",")
+            )
+        else:
+            counts = Counter(values)
+            counts.pop("", None)
+        return counts.most_common(limit)
+
+    def by_directory(self) -> list[DirectoryStats]:
+        """Roll up the files of each directory (usually an album)."""
+        rows: dict[str, list[int]] = defaultdict(list)
+        for i, directory in enumerate(self.directory):
+            rows[directory].append(i)
+
+        stats = []
+        for directory, indices in sorted(rows.items()):
+            genres = [self.genre[i] for i in indices]
+            years = [self.year[i] for i in indices]
+            stats.append(
+                DirectoryStats(
+                    directory=directory,
+                    files=len(indices),
+                    missing_genre=genres.count(""),
+                    missing_year=years.count(""),
+                    missing_cover=sum(1 for i in indices if not self.cover[i]),
+                    years=tuple(sorted(set(years) - {""})),
+                    duration=sum(self.duration[i] for i in indices),
+                )
+            )
+        return stats
@@ -0,0 +1,11 @@
+from typing import TypedDict
+
+
+class AudioTags(TypedDict):
+    artist: str
+    title: str
+    genre: str
+    date: str
+    cover: bool
+    isrc: str
+    duration: float
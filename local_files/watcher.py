@@ -0,0 +1,209 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+from local_files.library_index import LibraryIndex
+from local_files.logger import logger
+from local_files.music_files import AUDIO_FILES_EXTENSIONS, iter_music_paths
+
+# Seconds without any change before a new or modified file is considered written
+SETTLE_SECONDS = 2.0
+
+# Seconds between two scans of the directory by the polling watcher
+POLL_INTERVAL = 5.0
+
+# inotify event masks, from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+INOTIFY_EVENT = struct.Struct("iIII")
+
+
+def _is_music_path(path: Path) -> bool:
+    return path.suffix.lower() in AUDIO_FILES_EXTENSIONS
+
+
+class InotifyWatcher:
+    """Watch a directory tree for changed music files with Linux inotify.
+
+    The inotify system calls are made through ctypes, so no extra dependency
+    is needed. New subdirectories are watched as they appear.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            raise OSError("libc not found")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify not supported")
+        self._fd: int = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directory: Path = directory
+        self._watches: dict[int, Path] = {}
+        self._watch_tree(directory)
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+    def _watch_tree(self, directory: Path) -> list[Path]:
+        """Watch directory and its subdirectories, return the music files found."""
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            logger.warning(
+                f"Can't watch {directory}: {os.strerror(ctypes.get_errno())}"
+            )
+            return []
+        self._watches[wd] = directory
+
+        paths: list[Path] = []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    path = Path(entry.path)
+                    if entry.is_dir(follow_symlinks=False):
+                        paths.extend(self._watch_tree(path))
+                    elif _is_music_path(path):
+                        paths.append(path)
+        except OSError:
+            pass
+        return paths
+
+    def wait(self, timeout: float) -> set[Path]:
+        """Wait up to timeout seconds, return the music files changed meanwhile."""
+        changed: set[Path] = set()
+        if not select.select([self._fd], [], [], timeout)[0]:
+            return changed
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+
+        pos = 0
+        while pos < len(data):
+            wd, mask, _, length = INOTIFY_EVENT.unpack_from(data, pos)
+            pos += INOTIFY_EVENT.size
+            name = data[pos : pos + length].rstrip(b"\x00")
+            pos += length
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost, look at all the files again
+                logger.warning("Too many file events, rescanning the directory")
+                changed.update(iter_music_paths(self.directory))
+                continue
+            directory = self._watches.get(wd)
+            if directory is None or not name:
+                continue
+            path = directory / os.fsdecode(name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # Files moved in with a directory don't send their own events
+                    changed.update(self._watch_tree(path))
+            elif _is_music_path(path):
+                changed.add(path)
+        return changed
+
+
+class PollingWatcher:
+    """Watch a directory tree for changed music files by scanning it regularly.
+
+    Used where inotify is not available, or doesn't report the changes made
+    by other machines (network shares). Only the stat signature of each file
+    is compared, no file is read.
+    """
+
+    def __init__(self, directory: Path, interval: float = POLL_INTERVAL) -> None:
+        self.directory: Path = directory
+        self.interval: float = interval
+        self._signatures = self._scan()
+        self._last_scan: float = time.monotonic()
+
+    def close(self) -> None:
+        pass
+
+    def _scan(self) -> dict[Path, tuple[int, int, int] | None]:
+        return {
+            path: LibraryIndex.signature(path)
+            for path in iter_music_paths(self.directory)
+        }
+
+    def wait(self, timeout: float) -> set[Path]:
+        """Wait up to timeout seconds, return the music files changed meanwhile."""
+        time.sleep(
+            max(0.0, min(timeout, self._last_scan + self.interval - time.monotonic()))
+        )
+        if time.monotonic() - self._last_scan < self.interval:
+            return set()
+        signatures = self._scan()
+        self._last_scan = time.monotonic()
+        changed = {
+            path
+            for path, signature in signatures.items()
+            if self._signatures.get(path) != signature
+        }
+        self._signatures = signatures
+        return changed
+
+
+def watch_music_files(
+    directory: Path,
+    polling: bool = False,
+    settle: float = SETTLE_SECONDS,
+    interval: float = POLL_INTERVAL,
+) -> Iterator[Path]:
+    """Yield the music files created or modified in directory, as they land.
+
+    Changes are debounced: a file is only yielded once it has not changed for
+    settle seconds and its stat signature is stable, so files still being
+    copied or downloaded are never read half-written. Runs until interrupted.
+
+    Args:
+        directory: The directory to watch, including its subdirectories.
+        polling: Scan the directory regularly instead of using inotify, which
+            is also the fallback if inotify is not available.
+        settle: Seconds without change before a file is yielded.
+        interval: Seconds between two scans of the polling watcher.
+    """
+    watcher: InotifyWatcher | PollingWatcher
+    if polling:
+        watcher = PollingWatcher(directory, interval)
+    else:
+        try:
+            watcher = InotifyWatcher(directory)
+        except OSError as e:
+            logger.warning(f"inotify not available ({e}), polling for changes")
+            watcher = PollingWatcher(directory, interval)
+
+    # Changed files waiting to settle: last change time and stat signature
+    pending: dict[Path, tuple[float, tuple[int, int, int] | None]] = {}
+    try:
+        while True:
+            changed = watcher.wait(settle if pending else 60.0)
+            now = time.monotonic()
+            for path in changed:
+                pending[path] = (now, LibraryIndex.signature(path))
+
+            for path, (changed_at, signature) in sorted(pending.items()):
+                if now - changed_at < settle:
+                    continue
+                current = LibraryIndex.signature(path)
+                if current is None:
+                    del pending[path]  # Deleted or moved away
+                elif current != signature:
+                    pending[path] = (now, current)  # Still being written
+                else:
+                    del pending[path]
+                    yield path
+    finally:
+        watcher.close()
@@ -1,3 +1,4 @@
+import argparse
 import sys
 from pathlib import Path
 import inquirer
@@ -6,8 +7,13 @@ import discogs_client as dc
 
 from discogs import Config as DiscogsConfig
 from local_files import logger as discogs_logger
+from local_files.shard import shard_argument
 from scripts.update_tags_from_discogs import update_tags_from_discogs
 from scripts.rename_files_from_tags import rename_files_from_tags
+from scripts.find_duplicate_files import find_duplicate_files
+from scripts.watch_tags_from_discogs import watch_tags_from_discogs
+from scripts.merge_shards import merge_shards
+from scripts.library_report import library_report
 
 from spotify import Config as SpotifyConfig
 from ytmusic import Config as YTMusicConfig
@@ -162,6 +168,24 @@ def setup_media_path() -> Path:
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Music Sync Toolbox")
+    parser.add_argument(
+        "--shard",
+        type=shard_argument,
+        metavar="i/N",
+        help="Only process the i-th of N shards of the local files, to split a "
+        "run across several processes or machines",
+    )
+    parser.add_argument(
+        "--merge-shards",
+        action="store_true",
+        help="Merge the summaries and journals written by the shards of a run",
+    )
+    args = parser.parse_args()
+    if args.merge_shards:
+        merge_shards()
+        return
+
     # Setup configurations
     discogs_config, spotify_config, ytmusic_config = setup_config()
 
@@ -187,6 +211,18 @@ def main() -> None:
                     "💿  ➡️  🏷️  ➡️  📁  Update ID3 tags and rename files",
                     "discogs_both",
                 ),
+                (
+                    "👀  💿  ➡️  🏷️  Watch for new local files and tag them using Discogs",
+                    "discogs_watch",
+                ),
+                (
+                    "💿  🧹  Find duplicate audio files in the local library",
+                    "local_duplicates",
+                ),
+                (
+                    "💿  📊  Show statistics on the tags of the local library",
+                    "local_report",
+                ),
                 # Spotify options
                 (
                     "🟢  ➕  Add local files to Spotify playlist",
@@ -225,6 +261,9 @@ def main() -> None:
         "discogs_update",
         "discogs_rename",
         "discogs_both",
+        "discogs_watch",
+        "local_duplicates",
+        "local_report",
         "spotify_add",
         "ytmusic_add",
     ]:
@@ -235,18 +274,24 @@ def main() -> None:
         discogs_logger.info(f"\nUsing media directory: {media_path}\n")
 
     if action == "discogs_update":
-        update_tags_from_discogs(media_path, discogs_config, ds)
+        update_tags_from_discogs(media_path, discogs_config, ds, shard=args.shard)
     elif action == "discogs_rename":
-        rename_files_from_tags()
+        rename_files_from_tags(shard=args.shard)
     elif action == "discogs_both":
         discogs_logger.info("\nStep 1: Updating ID3 tags from Discogs...")
-        update_tags_from_discogs(media_path, discogs_config, ds)
+        update_tags_from_discogs(media_path, discogs_config, ds, shard=args.shard)
         discogs_logger.info("\nStep 2: Renaming files using updated ID3 tags...")
-        rename_files_from_tags()
+        rename_files_from_tags(shard=args.shard)
+    elif action == "discogs_watch":
+        watch_tags_from_discogs(media_path, discogs_config, ds)
+    elif action == "local_duplicates":
+        find_duplicate_files(media_path, workers=discogs_config.scan_workers)
+    elif action == "local_report":
+        library_report(media_path, workers=discogs_config.scan_workers)
     elif action == "spotify_add":
-        add_local_tracks_to_spotify()
+        add_local_tracks_to_spotify(shard=args.shard)
     elif action == "ytmusic_add":
-        add_local_tracks_to_ytmusic()
+        add_local_tracks_to_ytmusic(shard=args.shard)
     elif action == "spotify_import":
         import_ytmusic_to_spotify()
     elif action == "spotify_duplicates":
@@ -0,0 +1,103 @@
+import sys
+from pathlib import Path
+
+from rich.progress import (
+    BarColumn,
+    Progress,
+    SpinnerColumn,
+    TaskProgressColumn,
+    TextColumn,
+)
+
+from discogs.duplicates import find_near_duplicates
+from local_files import (
+    LibraryIndex,
+    find_duplicates,
+    iter_music_paths,
+    logger,
+    read_music_files,
+)
+
+
+def find_duplicate_files(directory: Path, workers: int = 1) -> None:
+    """Find the duplicate audio files of the local library.
+
+    Files are first compared on their audio payload only, so the same rip
+    tagged twice or named differently is reported as a duplicate. Then their
+    normalized artist and title tags are compared, to also report the likely
+    duplicates with different audio, e.g. "Artist - Title (Radio Edit)" and
+    "Artist - Title", or an MP3 and a FLAC of the same track.
+
+    Args:
+        directory: Path to the directory containing audio files to compare.
+        workers: Number of concurrent hashing and tag reading threads.
+
+    Note:
+        - Audio hashes and tags are stored in the library index, so later
+          runs only read new or modified files
+        - Different encodings of the same track (e.g. an MP3 and a FLAC) have
+          different audio payloads, they are only found by their tags
+    """
+    if not directory.is_dir():
+        logger.error(f'Directory "{directory}" not found.')
+        sys.exit(1)
+
+    paths = list(iter_music_paths(directory))
+    logger.info(f"Found {len(paths)} audio files in {directory}")
+
+    with (
+        LibraryIndex() as index,
+        Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+            TaskProgressColumn(),
+            transient=True,
+        ) as progress,
+    ):
+        task = progress.add_task("Hashing audio...", total=len(paths))
+        duplicates = find_duplicates(
+            paths,
+            index=index,
+            workers=workers,
+            on_hashed=lambda _: progress.advance(task),
+        )
+        music_files = read_music_files(paths, index=index, workers=workers)
+
+    # Groups whose files all have the same audio are already reported
+    same_audio = {path: i for i, group in enumerate(duplicates) for path in group}
+    near_duplicates = [
+        group
+        for group in find_near_duplicates(music_files)
+        if len({same_audio.get(f.path, f.path) for f in group}) > 1
+    ]
+
+    for i, group in enumerate(duplicates, 1):
+        logger.warning(f"\nDuplicate group {i} ({len(group)} files):")
+        for path in group:
+            logger.log(f"- {path}")
+
+    for i, group in enumerate(near_duplicates, 1):
+        logger.warning(
+            f"\nPossible duplicate group {i}: {group[0].artist} - {group[0].title}"
+        )
+        for music_file in group:
+            logger.log(f"- {music_file.path}")
+
+    logger.info("\nSummary:")
+    logger.log(f"Files compared: {len(paths)}")
+    logger.warning(f"Duplicate groups: {len(duplicates)}")
+    logger.warning(f"Redundant files: {sum(len(group) - 1 for group in duplicates)}")
+    logger.warning(
+        f"Possible duplicate groups (same artist and title): {len(near_duplicates)}"
+    )
+
+
+if __name__ == "__main__":
+    from local_files.config import Config
+
+    config = Config()
+    if not config.media_path:
+        logger.error("Media path is not set")
+        sys.exit(1)
+    find_duplicate_files(config.media_path, workers=config.scan_workers)
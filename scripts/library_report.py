@@ -0,0 +1,101 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from local_files import LibraryIndex, TagTable, iter_music_paths, logger
+
+# Number of values listed in each histogram of the report
+TOP_VALUES = 10
+
+
+def library_report(
+    directory: Path, workers: int = 1, missing: str | None = None
+) -> TagTable:
+    """Report statistics on the tags of the local library.
+
+    The tags of all the files are loaded (from the library index for the
+    files unchanged since they were indexed) into a columnar table, then the
+    report is computed over it: missing tags, most common genres, years and
+    formats, and the albums (directories) with mixed years.
+
+    Args:
+        directory: Path to the directory containing audio files to report on.
+        workers: Number of concurrent tag reading threads.
+        missing: Optional tag ("genre", "year"...), to list the files missing it.
+
+    Returns:
+        TagTable: The table of the tags, to run more queries on.
+    """
+    if not directory.is_dir():
+        logger.error(f'Directory "{directory}" not found.')
+        sys.exit(1)
+
+    logger.info(f"Loading tags of the files in {directory}...")
+    with LibraryIndex() as index:
+        table = TagTable.load(iter_music_paths(directory), index=index, workers=workers)
+    if not len(table):
+        logger.error("No audio files found")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    missing_counts = table.missing()
+    genres = table.histogram("genre", TOP_VALUES)
+    years = table.histogram("year", TOP_VALUES)
+    formats = table.histogram("suffix")
+    directories = table.by_directory()
+    mixed_years = [stats for stats in directories if len(stats.years) > 1]
+    elapsed = time.perf_counter() - start
+
+    total = len(table)
+    hours = sum(table.duration) / 3600
+    logger.info(
+        f"\nFiles: {total} ({hours:.1f} hours) in {len(directories)} directories"
+    )
+
+    logger.info("\nMissing tags:")
+    for column, count in missing_counts.items():
+        log = logger.warning if count else logger.log
+        log(f"- {column}: {count} ({count / total:.1%})")
+
+    for title, histogram in (
+        ("Top genres", genres),
+        ("Top years", years),
+        ("Formats", formats),
+    ):
+        logger.info(f"\n{title}:")
+        for value, count in histogram:
+            logger.log(f"- {value}: {count}")
+
+    logger.info(f"\nDirectories with mixed years: {len(mixed_years)}")
+    for stats in mixed_years:
+        logger.log(f"- {stats.directory}: {', '.join(stats.years)}")
+
+    if missing is not None:
+        value = 0 if missing == "cover" else ""
+        paths = table.where(**{missing: value})
+        logger.info(f"\nFiles without {missing}: {len(paths)}")
+        for path in paths:
+            logger.log(f"- {path}")
+
+    logger.log(f"\nReport computed in {elapsed * 1000:.0f} ms")
+    return table
+
+
+if __name__ == "__main__":
+    from local_files.config import Config
+    from local_files.tag_table import MISSING_VALUES
+
+    parser = argparse.ArgumentParser(description="Library stats report")
+    parser.add_argument(
+        "--missing",
+        choices=list(MISSING_VALUES),
+        help="List the files missing this tag",
+    )
+    args = parser.parse_args()
+
+    config = Config()
+    if not config.media_path:
+        logger.error("Media path is not set")
+        sys.exit(1)
+    library_report(config.media_path, workers=config.scan_workers, missing=args.missing)
@@ -18,13 +18,20 @@ from spotify import (
     add_track as add_track_to_spotify,
 )
 from logger import FileLogger
-from local_files import get_music_files, MusicFile
+from local_files import (
+    get_music_files,
+    MusicFile,
+    LibraryIndex,
+    Shard,
+    shard_from_args,
+    write_shard_summary,
+)
 
 config = SpotifyConfig()
 logger = FileLogger(Path("scripts") / "local_to_spotify.log")
 
 
-def main() -> None:
+def main(shard: Shard | None = None) -> None:
     # Initialize Spotify client
     sp = setup_spotify()
 
@@ -37,7 +44,14 @@ def main() -> None:
         sys.exit(1)
 
     # Scan directory for music files
-    music_files: list[MusicFile] = get_music_files(config.media_path)
+    with LibraryIndex() as index:
+        music_files: list[MusicFile] = get_music_files(
+            config.media_path,
+            index=index,
+            workers=config.scan_workers,
+            processes=config.scan_processes,
+            shard=shard,
+        )
 
     logger.info(f"Found {len(music_files)} music files in {config.media_path}")
 
@@ -101,7 +115,16 @@ def main() -> None:
     logger.info("\nSummary:")
     logger.success(f"Tracks added to Spotify: {tracks_added}")
     logger.warning(f"Tracks skipped: {tracks_skipped}")
+    if shard is not None:
+        write_shard_summary(
+            "local_to_spotify",
+            shard,
+            {
+                "Tracks added to Spotify": tracks_added,
+                "Tracks skipped": tracks_skipped,
+            },
+        )
 
 
 if __name__ == "__main__":
-    main()
+    main(shard=shard_from_args())
@@ -0,0 +1,40 @@
+from discogs import RunJournal
+from discogs.journal import JOURNAL_PATH
+from local_files import logger, merge_shard_summaries
+
+# Jobs that can be split into shards, with the title of their summary
+SHARDED_JOBS = {
+    "update_tags": "Update tags from Discogs",
+    "rename_files": "Rename files from tags",
+    "local_to_spotify": "Add local files to Spotify",
+    "local_to_ytmusic": "Add local files to YouTube Music",
+}
+
+
+def merge_shards() -> None:
+    """Combine the results of a run split into shards with --shard i/N.
+
+    The summaries written by the shards of each job are added up, and the
+    run journals of the Discogs tag updater shards are merged into the main
+    journal, so that later runs, sharded or not, skip the files done by any
+    shard. Copy the files written by shards running on other machines
+    (local_files/shards/ and discogs/discogs_journal.shard-*.db) here first.
+    """
+    for job, title in SHARDED_JOBS.items():
+        summary, shards = merge_shard_summaries(job)
+        if not shards:
+            continue
+        logger.info(f"\n{title} (shards {', '.join(shards)}):")
+        for label, count in summary.items():
+            logger.log(f"{label}: {count}")
+
+    shard_journals = sorted(JOURNAL_PATH.parent.glob(f"{JOURNAL_PATH.stem}.shard-*.db"))
+    if shard_journals:
+        with RunJournal() as journal:
+            for path in shard_journals:
+                records = journal.merge(path)
+                logger.log(f"Merged {records} journal records from {path}")
+
+
+if __name__ == "__main__":
+    merge_shards()
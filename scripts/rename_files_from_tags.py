@@ -2,10 +2,31 @@ import sys
 import tomllib
 from pathlib import Path
 
-from local_files import logger, get_music_files, MusicFile, rename_file
-
-
-def rename_files_from_tags() -> None:
+import inquirer
+
+from local_files import (
+    logger,
+    get_music_files,
+    MusicFile,
+    LibraryIndex,
+    plan_renames,
+    write_rename_plan,
+    read_rename_plan,
+    apply_rename_plan,
+    Shard,
+    shard_from_args,
+    write_shard_summary,
+)
+from local_files.rename_plan import (
+    PLAN_PATH,
+    RENAME,
+    ALREADY_NAMED,
+    COLLISION,
+    MISSING_TAGS,
+)
+
+
+def rename_files_from_tags(shard: Shard | None = None) -> None:
     """Rename music files based on their ID3 tags.
 
     Main function that processes all audio files in the configured media directory.
@@ -13,8 +34,13 @@ def rename_files_from_tags() -> None:
     and renames it to follow the 'artist - title.ext' format.
 
     The function reads the media directory path from config.toml and processes
-    all supported audio files recursively. It provides user confirmation for
-    each rename operation and generates a summary of the results.
+    all supported audio files recursively. The renames are first planned in
+    memory and written to a reviewable plan file, then applied in bulk after
+    a single user confirmation, and a summary of the results is generated.
+
+    Args:
+        shard: Optional shard ("i/N") of the renames to apply, to split a run
+            across several processes or machines.
 
     Raises:
         SystemExit: If the configuration file is missing, invalid, or if the
@@ -23,9 +49,16 @@ def rename_files_from_tags() -> None:
     Note:
         - Reads media directory path from config.toml [local_files] section
         - Processes all audio files in the directory and subdirectories
-        - Prompts user for confirmation before each rename
+        - Lists each directory once to detect name collisions, including
+          collisions between files of the same batch
+        - Writes the plan to local_files/rename_plan.tsv, entries can be
+          edited or removed before confirming
         - Provides detailed logging and summary statistics
-        - Skips files that cannot be read or have missing tags
+        - Skips files that cannot be read, have missing tags or would collide
+        - With a shard, only the files of the shard's directories are scanned
+          and renamed; files are renamed within their directory, and a rename
+          onto a file created meanwhile (by another shard, for the files at the
+          root of the media directory) is refused when applied
     """
     # Get media directory from config
     config_path = Path("config.toml")
@@ -37,6 +70,8 @@ def rename_files_from_tags() -> None:
         with open(config_path, "rb") as f:
             config = tomllib.load(f)
             media_path = Path(config["local_files"]["path"].replace("\\", ""))
+            scan_workers = config["local_files"].get("scan_workers", 1)
+            scan_processes = config["local_files"].get("scan_processes", False)
     except Exception as e:
         logger.error(f"Error reading config: {e}")
         sys.exit(1)
@@ -48,38 +83,77 @@ def rename_files_from_tags() -> None:
     # Show media path to user
     logger.info(f"Using media directory: {media_path}")
 
-    # Get all audio files
-    audio_files: list[MusicFile] = get_music_files(media_path)
-    if not audio_files:
-        logger.error("No audio files found")
-        sys.exit(1)
-
-    logger.info(f"Found {len(audio_files)} audio files")
-
-    # Process each file
-    renamed = 0
-    skipped = 0
-    already_correct = 0
-    for music_file in audio_files:
-        # Check if we have valid artist and title tags
-        if music_file.artist and music_file.title:
-            was_renamed, was_skipped = rename_file(music_file)
-            if was_renamed:
-                renamed += 1
-            elif was_skipped:
-                skipped += 1
-            else:
-                already_correct += 1
-        else:
-            logger.warning(f"Missing artist or title tags in: {music_file.path}")
-            skipped += 1
+    with LibraryIndex() as index:
+        # Get all audio files
+        audio_files: list[MusicFile] = get_music_files(
+            media_path,
+            index=index,
+            workers=scan_workers,
+            processes=scan_processes,
+            shard=shard,
+        )
+        if not audio_files:
+            logger.error("No audio files found")
+            sys.exit(1)
+
+        logger.info(f"Found {len(audio_files)} audio files")
+
+        # Plan all the renames, then write the plan for review
+        plan = plan_renames(audio_files)
+        plan_path = PLAN_PATH
+        if shard is not None:
+            plan_path = PLAN_PATH.with_name(f"{PLAN_PATH.stem}.{shard.suffix}.tsv")
+        write_rename_plan(plan, plan_path)
+        statuses = [entry.status for entry in plan]
+        for entry in plan:
+            if entry.status == COLLISION:
+                logger.warning(f"File already exists: {entry.target}")
+        logger.info(
+            f"Rename plan written to {plan_path}: {statuses.count(RENAME)} to "
+            f"rename, {statuses.count(COLLISION)} collisions, "
+            f"{statuses.count(MISSING_TAGS)} with missing tags"
+        )
+
+        renamed = 0
+        failed = 0
+        if statuses.count(RENAME):
+            questions = [
+                inquirer.Confirm(
+                    "confirm",
+                    message=f"Apply the renames listed in {plan_path}?",
+                    default=True,
+                )
+            ]
+            answers = inquirer.prompt(questions)
+            if answers and answers["confirm"]:
+                # Read the plan back, so that the edits made while reviewing it apply
+                renamed, failed = apply_rename_plan(
+                    read_rename_plan(plan_path), index=index
+                )
 
     # Print summary
     logger.info("\nSummary:")
     logger.success(f"Files renamed: {renamed}")
-    logger.info(f"Files already correctly named: {already_correct}")
-    logger.warning(f"Files skipped: {skipped}")
+    logger.info(f"Files already correctly named: {statuses.count(ALREADY_NAMED)}")
+    logger.warning(
+        f"Files skipped: {len(statuses) - renamed - statuses.count(ALREADY_NAMED)}"
+    )
+    if failed:
+        logger.error(f"Files that could not be renamed: {failed}")
+    if shard is not None:
+        write_shard_summary(
+            "rename_files",
+            shard,
+            {
+                "Files renamed": renamed,
+                "Files already correctly named": statuses.count(ALREADY_NAMED),
+                "Files skipped": len(statuses)
+                - renamed
+                - statuses.count(ALREADY_NAMED),
+                "Files that could not be renamed": failed,
+            },
+        )
 
 
 if __name__ == "__main__":
-    rename_files_from_tags()
+    rename_files_from_tags(shard=shard_from_args())
@@ -11,6 +11,7 @@ from rich.progress import (
 )
 
 from spotify import (
+    SpotifyTrackInfo,
     Config as SpotifyConfig,
     setup_spotify,
     select_playlist as select_spotify_playlist,
@@ -35,7 +36,7 @@ ytmusic_config = YTMusicConfig()
 
 def process_tracks(
     ytm: YTMusic,
-    tracks: list[dict],
+    tracks: list[SpotifyTrackInfo],
     existing_tracks: set[str],
     ytmusic_playlist_id: str,
 ) -> tuple[int, int]:
@@ -55,8 +56,8 @@ def process_tracks(
     ) as progress:
         task = progress.add_task("Processing tracks...", total=len(tracks))
         for track in tracks:
-            track_name = track["name"]
-            artist_name = track["artist"]
+            track_name = track.name
+            artist_name = track.artist
 
             matches = search_ytmusic_track(ytm, track_name, artist_name)
             if matches:
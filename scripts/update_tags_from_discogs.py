@@ -1,5 +1,7 @@
 import sys
+import threading
 import tomllib
+from collections.abc import Callable, Iterator
 from pathlib import Path
 
 from rich.progress import (
@@ -10,12 +12,53 @@ from rich.progress import (
     TaskProgressColumn,
 )
 
-from local_files import logger, AUDIO_FILES_EXTENSIONS, rename_file
-from discogs import DTag, Config as DiscogsConfig
+from local_files import (
+    logger,
+    LibraryIndex,
+    iter_music_paths,
+    iter_music_files,
+    rename_file,
+    Shard,
+    shard_from_args,
+    write_shard_summary,
+)
+from discogs import (
+    DTag,
+    RunJournal,
+    TagWriter,
+    Stage,
+    FolderCovers,
+    SearchCache,
+    CoverCache,
+    Config as DiscogsConfig,
+)
+from discogs.api_budget import api_budget, throttle
+from discogs.dtag import IN_PLACE, FULL_REWRITE
+from discogs.journal import FOUND, JOURNAL_PATH, NOT_FOUND, UPDATED, journal_path
 import discogs_client as dc
 
 
-def update_tags_from_discogs(directory: Path, config=None, ds=None) -> None:
+def log_results(tag_file: DTag) -> None:
+    """Print file results info."""
+    if tag_file.genres_updated:
+        logger.success(f"- Genres: {tag_file.local_genres} ➔ {tag_file.genres}")
+    else:
+        logger.log(f"- Genres: {tag_file.local_genres} ➔ not updated")
+
+    if tag_file.year_updated:
+        logger.success(f"- Year: {tag_file.local_year} ➔ {tag_file.year}")
+    else:
+        logger.log(f"- Year: {tag_file.local_year} ➔ not updated")
+
+    if tag_file.cover_updated:
+        logger.success("- Cover: ➔ updated\n")
+    else:
+        logger.log("- Cover: ➔ not updated\n")
+
+
+def update_tags_from_discogs(
+    directory: Path, config=None, ds=None, shard: Shard | None = None
+) -> None:
     """Update music file tags using Discogs metadata.
 
     Main function that processes all audio files in the specified directory,
@@ -30,6 +73,8 @@ def update_tags_from_discogs(directory: Path, config=None, ds=None) -> None:
         directory: Path to the directory containing audio files to process.
         config: Configuration object containing Discogs and file processing settings.
         ds: Authenticated Discogs client instance.
+        shard: Optional shard ("i/N") of the files to process, to split a run
+            across several processes or machines.
 
     Raises:
         ValueError: If config or ds parameters are not provided.
@@ -41,7 +86,25 @@ def update_tags_from_discogs(directory: Path, config=None, ds=None) -> None:
         - Updates genres, year, and cover art based on configuration settings
         - Optionally renames files to 'artist - title.ext' format
         - Provides detailed progress tracking and summary statistics
-        - Respects API rate limits with built-in delays and retry logic
+        - Respects API rate limits: all the Discogs requests (searches,
+          master fetches, image downloads) share a token bucket following
+          the rate limit headers, with a jittered backoff when rejected
+        - Runs as a pipeline of stages connected by bounded queues: tags
+          reading, planning (renaming), Discogs searches, cover downloads,
+          tags writing and report, each with its own threads, so that the
+          searches never wait on disk or image downloads
+        - With the folder_cover option, writes one cover.jpg per album
+          directory instead of embedding the same cover in all its tracks
+        - Records each file outcome in the run journal, and with the
+          incremental option skips files unchanged since their last success
+        - Streams the files in path order: each file is searched as soon as
+          its tags are read, a few files being read ahead by the scan workers,
+          the outcomes being reported as the files leave the pipeline
+        - With a shard, only processes its part of the files, with its own
+          run journal and summary, and a share of the Discogs API budget
+        - Caches the Discogs search results, re-runs only search Discogs for
+          queries not answered recently, and files sharing a query (the same
+          track in several formats or compilations) share a single search
     """
     if not config or not ds:
         raise ValueError("config and ds parameters are required")
@@ -51,74 +114,240 @@ def update_tags_from_discogs(directory: Path, config=None, ds=None) -> None:
         logger.error(f'Directory "{directory}" not found.')
         sys.exit(1)
 
-    # create discogs session
+    # create discogs session, all its requests share the api budget
+    throttle(ds)
     me = ds.identity()
     logger.log(f"Discogs User: {me}")
 
     logger.log(f"Looking for files in {directory}")
-    logger.warning("Indexing audio files... Please wait\n")
+    if shard is not None:
+        logger.log(f"Shard: {shard}")
+    # All the shards search with the same token
+    api_budget.shares = shard.count if shard is not None else 1
     not_found: int = 0
     found: int = 0
     renamed: int = 0
+    skipped: int = 0
+    unchanged: int = 0
+    written_in_place: int = 0
+    rewritten: int = 0
+    errors: int = 0
+    unsupported: int = 0
     total: int = 0
-    files = {
-        DTag(path=p, original_filename=p.name, config=config, ds=ds)
-        for p in directory.rglob("*")
-        if p.suffix in AUDIO_FILES_EXTENSIONS
-    }
+
+    def make_tag(path: Path, index: LibraryIndex | None = None) -> DTag:
+        return DTag(
+            path=path,
+            original_filename=path.name,
+            config=config,
+            ds=ds,
+            index=index,
+            cache=cache,
+            covers=covers,
+        )
+
+    def shard_paths() -> Iterator[Path]:
+        paths = iter_music_paths(directory)
+        return shard.filter(paths, directory) if shard is not None else paths
+
+    def paths_to_process(on_skip: Callable[[], None]) -> Iterator[Path]:
+        """Yield the paths of the files to process, lazily, in path order."""
+        nonlocal skipped
+        for path in shard_paths():
+            if config.incremental and journal.is_done(path):
+                # Successfully processed by a previous run and unchanged since
+                skipped += 1
+                on_skip()
+                continue
+            yield path
+
+    def report(tag_file: DTag, outcome: str) -> None:
+        """Record and log the outcome of a file, as the last stage."""
+        logger.log(
+            "____________________________________________________________________\n"
+            + f"File: {tag_file.original_filename}"
+        )
+        journal.record(tag_file.path, outcome, tag_file.genres, tag_file.year)
+        log_results(tag_file)
+        progress.advance(task)
+
+    def report_error(tag_file: DTag, step: str, error: Exception) -> None:
+        """Log a file that failed, not recorded so that the next run tries again."""
+        nonlocal errors
+        errors += 1
+        logger.error(f"Error {step} {tag_file.path}: {error}\n")
+        progress.advance(task)
+
+    def searched(tag_file: DTag, result: bool | None, error: Exception | None) -> None:
+        """Pass a searched file on to the cover fetching or writing stage."""
+        nonlocal found, not_found, unchanged, unsupported
+        if error is not None:
+            report_error(tag_file, "searching", error)
+            return
+        if config.embed_cover and config.folder_cover:
+            folder_covers.add(tag_file)
+        if result is not None:
+            not_found += 1
+            report(tag_file, NOT_FOUND)
+            return
+        if not tag_file.writable:
+            # Not recorded, the file is not done until its tags can be written
+            unsupported += 1
+            logger.warning(f"Unsupported format, tags not written: {tag_file.path}\n")
+            progress.advance(task)
+            return
+        changes = tag_file.changes
+        if "cover" in changes:
+            fetcher.submit(tag_file)
+        elif changes:
+            writer.submit(tag_file)
+        else:
+            # Nothing to write, the file is left untouched
+            found += 1
+            unchanged += 1
+            report(tag_file, FOUND)
+
+    def fetched(tag_file: DTag, error: Exception | None) -> None:
+        """Pass a file whose cover was downloaded on to the writing stage."""
+        if error is not None:
+            report_error(tag_file, "downloading the cover of", error)
+            return
+        writer.submit(tag_file)
+
+    def saved(tag_file: DTag, error: Exception | None) -> None:
+        """Pass a file whose tags were saved on to the report."""
+        nonlocal found, written_in_place, rewritten, unchanged
+        if error is not None:
+            report_error(tag_file, "writing tags of", error)
+            return
+        found += 1
+        if tag_file.write_mode == IN_PLACE:
+            written_in_place += 1
+        elif tag_file.write_mode == FULL_REWRITE:
+            rewritten += 1
+        else:
+            # Only the cover would have changed, and it was already embedded
+            unchanged += 1
+        if tag_file.genres_updated or tag_file.year_updated or tag_file.cover_updated:
+            report(tag_file, UPDATED)
+        else:
+            report(tag_file, FOUND)
+
+    def advance(block: bool = False) -> None:
+        """Move the files done by the stages on to the next ones."""
+        for tag_file, result, error in searcher.completed(block):
+            searched(tag_file, result, error)
+        for tag_file, _, error in fetcher.completed():
+            fetched(tag_file, error)
+        for tag_file, _, error in writer.completed():
+            saved(tag_file, error)
 
     logger.info("\nProcessing files...")
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[progress.description]{task.description}"),
-        BarColumn(),
-        TaskProgressColumn(),
-        transient=True,
-    ) as progress:
-        task = progress.add_task("Processing files...", total=len(files))
+    with (
+        RunJournal(
+            journal_path(shard),
+            root=directory,
+            merged=JOURNAL_PATH if shard is not None else None,
+        ) as journal,
+        CoverCache(max_mb=config.cover_cache_mb) as covers,
+        Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+            TaskProgressColumn(),
+            transient=True,
+        ) as progress,
+        LibraryIndex() as index,
+        SearchCache(
+            ttl_days=config.search_cache_days, max_entries=config.search_cache_size
+        ) as cache,
+        Stage("search", DTag.search, workers=config.search_workers) as searcher,
+        Stage("fetch", DTag.fetch_cover, workers=config.fetch_workers) as fetcher,
+        TagWriter(workers=config.write_workers) as writer,
+    ):
+        folder_covers = FolderCovers(overwrite=config.overwrite_cover, covers=covers)
+
+        # The files are counted in the background, not to delay the first search
+        task = progress.add_task("Processing files...", total=None)
+        threading.Thread(
+            target=lambda: progress.update(task, total=sum(1 for _ in shard_paths())),
+            daemon=True,
+        ).start()
+
+        # Scan stage: DTag holds the Discogs client, so tags are read with
+        # threads only
+        files = iter_music_files(
+            paths_to_process(on_skip=lambda: progress.advance(task)),
+            factory=make_tag,
+            index=index,
+            workers=config.scan_workers,
+        )
         for tag_file in files:
             total += 1
-            logger.log(
-                "____________________________________________________________________\n"
-                + f"File: {tag_file.original_filename}"
-            )
 
-            # Rename file
+            # Planning stage: the file is renamed, and searched if it can be
             if config.rename_file and tag_file.artist and tag_file.title:
                 was_renamed, was_skipped = rename_file(tag_file, confirm=False)
                 if was_renamed:
                     renamed += 1
-
-            # Search on Discogs and update
-            if tag_file.search() is None:
-                tag_file.save()
-                found += 1
+            if tag_file.artist == "" and tag_file.title == "":
+                searched(tag_file, tag_file.search(), None)
             else:
-                not_found += 1
+                searcher.submit(tag_file)
+            advance()
 
-            # Print file results info
-            if tag_file.genres_updated:
-                logger.success(f"- Genres: {tag_file.local_genres} ➔ {tag_file.genres}")
-            else:
-                logger.log(f"- Genres: {tag_file.local_genres} ➔ not updated")
-
-            if tag_file.year_updated:
-                logger.success(f"- Year: {tag_file.local_year} ➔ {tag_file.year}")
-            else:
-                logger.log(f"- Year: {tag_file.local_year} ➔ not updated")
-
-            if tag_file.cover_updated:
-                logger.success("- Cover: ➔ updated\n")
-            else:
-                logger.log("- Cover: ➔ not updated\n")
-
-            progress.advance(task)
+        # Let each stage finish, in order, the files still in the pipeline
+        while searcher.pending:
+            advance(block=True)
+        fetcher.close()
+        advance()
+        writer.close()
+        advance()
+        index_hits = index.hits
+        covers_written = folder_covers.write()
 
     logger.log(f"Total files: {total}")
     logger.success(f"With Discogs info found: {found}")
     logger.error(f"With Discogs info not found: {not_found}")
-    logger.warning(f"Renamed: {renamed}\n")
-    input("Press Enter to exit...")
+    logger.error(f"Errors (retried on the next run): {errors}")
+    logger.warning(f"Renamed: {renamed}")
+    logger.log(f"Unchanged (tags already up to date): {unchanged}")
+    logger.warning(f"Unsupported format (tags not written): {unsupported}")
+    logger.log(f"Tags written in place: {written_in_place}")
+    logger.log(f"Files fully rewritten (padding reserved): {rewritten}")
+    if config.embed_cover and config.folder_cover:
+        logger.log(f"Folder covers written: {covers_written}")
+    logger.log(f"Tags read from library index: {index_hits}/{total}")
+    lookups = cache.hits + cache.coalesced + cache.misses
+    logger.log(f"Discogs searches from cache: {cache.hits}/{lookups}")
+    logger.log(f"Discogs searches shared with another file: {cache.coalesced}")
+    logger.log(f"Covers downloaded: {covers.downloads} (from cache: {covers.hits})")
+    logger.log(f"Skipped (unchanged since last run): {skipped}\n")
+    if shard is not None:
+        write_shard_summary(
+            "update_tags",
+            shard,
+            {
+                "Total files": total,
+                "With Discogs info found": found,
+                "With Discogs info not found": not_found,
+                "Errors (retried on the next run)": errors,
+                "Renamed": renamed,
+                "Unchanged (tags already up to date)": unchanged,
+                "Unsupported format (tags not written)": unsupported,
+                "Tags written in place": written_in_place,
+                "Files fully rewritten (padding reserved)": rewritten,
+                "Folder covers written": covers_written,
+                "Discogs searches from cache": cache.hits,
+                "Discogs searches shared with another file": cache.coalesced,
+                "Discogs searches sent": cache.misses,
+                "Covers downloaded": covers.downloads,
+                "Skipped (unchanged since last run)": skipped,
+            },
+        )
+    else:
+        # Shards are meant to run unattended
+        input("Press Enter to exit...")
 
 
 if __name__ == "__main__":
@@ -145,4 +374,4 @@ if __name__ == "__main__":
     ds = dc.Client("discogs_tag/0.5", user_token=discogs_config.token)
 
     # Run the update
-    update_tags_from_discogs(media_path, discogs_config, ds)
+    update_tags_from_discogs(media_path, discogs_config, ds, shard=shard_from_args())
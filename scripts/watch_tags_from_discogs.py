@@ -0,0 +1,132 @@
+import sys
+from pathlib import Path
+
+import discogs_client as dc
+
+from discogs import Config as DiscogsConfig
+from discogs import CoverCache, DTag, RunJournal, SearchCache
+from discogs.api_budget import throttle
+from discogs.journal import FOUND, NOT_FOUND, UPDATED
+from local_files import LibraryIndex, logger, rename_file, watch_music_files
+from scripts.update_tags_from_discogs import log_results
+
+
+def watch_tags_from_discogs(directory: Path, config=None, ds=None) -> None:
+    """Tag the music files added to a directory as they land, using Discogs.
+
+    Long-running counterpart of update_tags_from_discogs: the directory is
+    watched (with inotify, or by polling it) and each new or modified audio
+    file is searched on Discogs, tagged and optionally renamed, a few seconds
+    after it has been completely written. Runs until interrupted (Ctrl+C).
+
+    Args:
+        directory: Path to the directory to watch.
+        config: Configuration object containing Discogs and file processing settings.
+        ds: Authenticated Discogs client instance.
+
+    Raises:
+        ValueError: If config or ds parameters are not provided.
+        SystemExit: If the directory doesn't exist or is invalid.
+
+    Note:
+        - Files already in the directory are not processed, run the updater
+          for them
+        - Files written by the watcher itself (tags, renames) and files
+          unchanged since their last success in the run journal are skipped
+        - Set watch_polling in config.toml to poll network shares, whose
+          changes made by other machines are not reported by inotify
+    """
+    if not config or not ds:
+        raise ValueError("config and ds parameters are required")
+
+    if not directory.is_dir():
+        logger.error(f'Directory "{directory}" not found.')
+        sys.exit(1)
+
+    throttle(ds)
+    logger.log(f"Discogs User: {ds.identity()}")
+    logger.info(f"Watching {directory} for new files... Press Ctrl+C to stop\n")
+
+    # Stat signature of the files processed, to skip the changes we made
+    processed: dict[Path, tuple[int, int, int] | None] = {}
+    total: int = 0
+    with (
+        RunJournal(root=directory) as journal,
+        LibraryIndex() as index,
+        SearchCache(
+            ttl_days=config.search_cache_days, max_entries=config.search_cache_size
+        ) as cache,
+        CoverCache(max_mb=config.cover_cache_mb) as covers,
+    ):
+        try:
+            for path in watch_music_files(directory, polling=config.watch_polling):
+                if processed.get(path) == LibraryIndex.signature(
+                    path
+                ) or journal.is_done(path):
+                    continue
+
+                total += 1
+                tag_file = DTag(
+                    path=path,
+                    original_filename=path.name,
+                    config=config,
+                    ds=ds,
+                    index=index,
+                    cache=cache,
+                    covers=covers,
+                )
+                logger.log(
+                    "____________________________________________________________________\n"
+                    + f"File: {tag_file.original_filename}"
+                )
+
+                if config.rename_file and tag_file.artist and tag_file.title:
+                    rename_file(tag_file, confirm=False)
+
+                try:
+                    found_on_discogs = tag_file.search() is None
+                except Exception as e:
+                    # Not journaled, so that the next change of the file retries
+                    logger.error(f"Error searching {tag_file.path}: {e}\n")
+                    continue
+
+                if found_on_discogs and not tag_file.writable:
+                    # Not journaled, the file is not done until its tags can
+                    # be written
+                    logger.warning(
+                        f"Unsupported format, tags not written: {tag_file.path}\n"
+                    )
+                    continue
+                if found_on_discogs:
+                    try:
+                        tag_file.save()
+                    except Exception as e:
+                        logger.error(f"Error writing tags of {tag_file.path}: {e}\n")
+                        continue
+                    if (
+                        tag_file.genres_updated
+                        or tag_file.year_updated
+                        or tag_file.cover_updated
+                    ):
+                        outcome = UPDATED
+                    else:
+                        outcome = FOUND
+                else:
+                    outcome = NOT_FOUND
+                journal.record(tag_file.path, outcome, tag_file.genres, tag_file.year)
+                processed[tag_file.path] = LibraryIndex.signature(tag_file.path)
+                index.commit()
+                log_results(tag_file)
+        except KeyboardInterrupt:
+            pass
+
+    logger.info(f"\nStopped watching, files processed: {total}")
+
+
+if __name__ == "__main__":
+    discogs_config = DiscogsConfig()
+    if not discogs_config.media_path:
+        logger.error("Media path is not set")
+        sys.exit(1)
+    ds = dc.Client("discogs_tag/0.5", user_token=discogs_config.token)
+    watch_tags_from_discogs(discogs_config.media_path, discogs_config, ds)
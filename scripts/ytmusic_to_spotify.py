@@ -19,6 +19,7 @@ from spotify import (
     search_track as search_spotify_track,
 )
 from ytmusic import (
+    YTMusicTrackInfo,
     Config as YTMusicConfig,
     setup_ytmusic,
     select_playlist as select_ytmusic_playlist,
@@ -34,7 +35,7 @@ ytmusic_config = YTMusicConfig()
 
 def process_tracks(
     sp: spotipy.Spotify,
-    tracks: list[dict],
+    tracks: list[YTMusicTrackInfo],
     existing_tracks: set[str],
     spotify_playlist_id: str,
 ) -> tuple[int, int]:
@@ -54,8 +55,8 @@ def process_tracks(
     ) as progress:
         task = progress.add_task("Processing tracks...", total=len(tracks))
         for track in tracks:
-            track_name = track["name"]
-            artist_name = track["artist"]
+            track_name = track.name
+            artist_name = track.artist
 
             # Define search function with access to auto_first
             def search_with_auto_first(
@@ -1,5 +1,5 @@
 from spotify.config import Config
-from spotify.types import SpotifyPlaylistInfo
+from spotify.types import SpotifyPlaylistInfo, SpotifyTrackInfo
 from spotify.setup_spotify import setup_spotify
 from spotify.list_user_playlists import list_user_playlists
 from spotify.select_playlist import select_playlist
@@ -14,6 +14,7 @@ __all__ = [
     "spotify_logger",
     "Config",
     "SpotifyPlaylistInfo",
+    "SpotifyTrackInfo",
     "setup_spotify",
     "list_user_playlists",
     "select_playlist",
@@ -32,6 +32,11 @@ class Config:
             raw_path = config["local_files"]["path"].replace("\\", "")
             self.media_path = Path(raw_path)
 
+        # Local files scanning options
+        local_files_config = config.get("local_files", {})
+        self.scan_workers = local_files_config.get("scan_workers", 1)
+        self.scan_processes = local_files_config.get("scan_processes", False)
+
         # Spotify config
         spotify_config = config["spotify"]
         self.client_id = spotify_config["client_id"]
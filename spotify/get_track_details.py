@@ -1,11 +1,12 @@
 import spotipy
 import sys
 from spotify.logger import logger
+from spotify.types import SpotifyTrackInfo
 
 
 def get_playlist_track_details(
     sp: spotipy.Spotify, spotify_playlist_id: str
-) -> list[dict]:
+) -> list[SpotifyTrackInfo]:
     """Extract track details (name and artist) from a Spotify playlist.
 
     Fetches all tracks from a Spotify playlist and extracts their basic metadata
@@ -17,9 +18,9 @@ def get_playlist_track_details(
         spotify_playlist_id: Spotify playlist ID or "liked" for Liked Songs
 
     Returns:
-        List of dictionaries, each containing:
+        List of SpotifyTrackInfo tuples, each containing:
             - name: Track title
-            - artist: Primary artist name
+            - artist: Primary artist name (interned)
 
     Raises:
         SystemExit: If there's an error fetching the playlist or if no tracks
@@ -32,7 +33,7 @@ def get_playlist_track_details(
         - Exits the program if the playlist is empty or inaccessible
     """
     logger.info(f'Fetching tracks from Spotify playlist "{spotify_playlist_id}"...')
-    tracks: list[dict] = []
+    tracks: list[SpotifyTrackInfo] = []
     try:
         if spotify_playlist_id == "liked":
             # Special case for Liked Songs
@@ -45,7 +46,9 @@ def get_playlist_track_details(
                     if not track.get("name") or not track.get("artists"):
                         continue
                     tracks.append(
-                        {"name": track["name"], "artist": track["artists"][0]["name"]}
+                        SpotifyTrackInfo(
+                            track["name"], sys.intern(track["artists"][0]["name"])
+                        )
                     )
                 if results["next"]:
                     results = sp.next(results)
@@ -62,7 +65,9 @@ def get_playlist_track_details(
                     if not track.get("name") or not track.get("artists"):
                         continue
                     tracks.append(
-                        {"name": track["name"], "artist": track["artists"][0]["name"]}
+                        SpotifyTrackInfo(
+                            track["name"], sys.intern(track["artists"][0]["name"])
+                        )
                     )
                 if results["next"]:
                     results = sp.next(results)
@@ -1,7 +1,18 @@
-from typing import TypedDict
+from typing import NamedTuple, TypedDict
 
 
 class SpotifyPlaylistInfo(TypedDict):
     name: str
     id: str
     track_count: int
+
+
+class SpotifyTrackInfo(NamedTuple):
+    """Name and primary artist of a playlist track.
+
+    A tuple is much lighter than a dict for whole-library playlists, and
+    artist names are interned so that tracks of the same artist share them.
+    """
+
+    name: str
+    artist: str
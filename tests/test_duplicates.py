@@ -0,0 +1,28 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+from discogs.duplicates import duplicate_key, find_near_duplicates
+
+
+def music_file(path: str, artist: str, title: str) -> SimpleNamespace:
+    return SimpleNamespace(path=Path(path), artist=artist, title=title)
+
+
+def test_titles_differing_after_ampersand_or_comma_are_not_duplicates():
+    files = [
+        music_file("/m/a.mp3", "Artist", "Love & Hate"),
+        music_file("/m/b.mp3", "Artist", "Love & War"),
+        music_file("/m/c.mp3", "Artist", "Stop, Look"),
+        music_file("/m/d.mp3", "Artist", "Stop, Listen"),
+    ]
+    assert len({duplicate_key(f) for f in files}) == 4
+    assert find_near_duplicates(files) == []
+
+
+def test_versions_and_featured_artists_are_duplicates():
+    files = [
+        music_file("/m/a.mp3", "Artist & Guest", "Love & Hate (Radio Edit)"),
+        music_file("/m/b.flac", "Artist", "Love & Hate - Remastered"),
+    ]
+    assert duplicate_key(files[0]) == duplicate_key(files[1])
+    assert find_near_duplicates(files) == [files]
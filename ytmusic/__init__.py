@@ -1,5 +1,5 @@
 from ytmusic.config import Config
-from ytmusic.types import YTMusicPlaylistInfo
+from ytmusic.types import YTMusicPlaylistInfo, YTMusicTrackInfo
 from ytmusic.setup_ytmusic import setup_ytmusic
 from ytmusic.list_user_playlists import list_user_playlists
 from ytmusic.select_playlist import select_playlist
@@ -15,6 +15,7 @@ __all__ = [
     "ytmusic_logger",
     "Config",
     "YTMusicPlaylistInfo",
+    "YTMusicTrackInfo",
     "setup_ytmusic",
     "list_user_playlists",
     "select_playlist",
@@ -1,9 +1,12 @@
 from ytmusicapi import YTMusic
 import sys
 from ytmusic.logger import logger
+from ytmusic.types import YTMusicTrackInfo
 
 
-def get_playlist_track_details(ytm: YTMusic, ytmusic_playlist_id: str) -> list[dict]:
+def get_playlist_track_details(
+    ytm: YTMusic, ytmusic_playlist_id: str
+) -> list[YTMusicTrackInfo]:
     """
     Get track details (name, artist) from a YouTube Music playlist or Liked Music.
 
@@ -12,7 +15,8 @@ def get_playlist_track_details(ytm: YTMusic, ytmusic_playlist_id: str) -> list[d
         ytmusic_playlist_id: Playlist ID or "LM" for Liked Music.
 
     Returns:
-        list[dict]: List of tracks, each with "name" and "artist" keys.
+        list[YTMusicTrackInfo]: List of tracks, each with "name" and (interned)
+            "artist" fields.
 
     Raises:
         SystemExit: If fetching fails or no tracks are found.
@@ -24,7 +28,7 @@ def get_playlist_track_details(ytm: YTMusic, ytmusic_playlist_id: str) -> list[d
     logger.info(
         f'Fetching tracks from YouTube Music playlist "{ytmusic_playlist_id}"...'
     )
-    tracks: list[dict] = []
+    tracks: list[YTMusicTrackInfo] = []
     try:
         if ytmusic_playlist_id == "LM":
             # Special case for Liked Music
@@ -33,10 +37,9 @@ def get_playlist_track_details(ytm: YTMusic, ytmusic_playlist_id: str) -> list[d
                 if not track.get("title") or not track.get("artists"):
                     continue
                 tracks.append(
-                    {
-                        "name": track["title"],
-                        "artist": track["artists"][0]["name"],
-                    }
+                    YTMusicTrackInfo(
+                        track["title"], sys.intern(track["artists"][0]["name"])
+                    )
                 )
         else:
             # Regular playlist
@@ -45,10 +48,9 @@ def get_playlist_track_details(ytm: YTMusic, ytmusic_playlist_id: str) -> list[d
                 if not track.get("title") or not track.get("artists"):
                     continue
                 tracks.append(
-                    {
-                        "name": track["title"],
-                        "artist": track["artists"][0]["name"],
-                    }
+                    YTMusicTrackInfo(
+                        track["title"], sys.intern(track["artists"][0]["name"])
+                    )
                 )
     except Exception as e:
         logger.error(f"Error fetching YouTube Music playlist: {e}")